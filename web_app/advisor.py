@@ -0,0 +1,208 @@
+import re
+
+# Suitability Advisor Analysis
+# Margin analysis and feasibility surfaces for /predict. Classes and rules are read the way
+# perform_logical_assessment reads them, so the advisor predicts what /evaluate will decide:
+# a rule on a property the applicant did not supply never matches.
+
+NUMERIC_OPS = {'minInclusive', 'maxInclusive', 'minExclusive', 'maxExclusive'}
+INCLUSIVE_OPS = {'minInclusive', 'maxInclusive'}
+
+# Which grid axis drives each property; everything else stays at the applicant's value
+INCOME_PROPS = {'hasMonthlyIncome', 'hasDTI'}
+TENURE_PROPS = {'hasLoanTenure'}
+AMOUNT_PROPS = {'requestedLoanAmount'}
+
+DEFAULT_INCOME_STEPS = [0.5, 0.75, 1.0, 1.25, 1.5, 2.0]
+DEFAULT_AMOUNT_STEPS = [0.5, 0.75, 1.0, 1.25, 1.5]
+DEFAULT_TENURES = [12, 24, 36, 60, 84, 120, 180, 240]
+MAX_AXIS_POINTS = 25
+
+# /evaluate never passes loan tenure to the rules, so ExceededTenureApplicant (hasLoanTenure > 0,
+# true for every loan) cannot fire there. Rejections are checked without these inputs so the
+# advisor does not warn about a rule the live decision never applies.
+LIVE_UNEVALUATED_PROPS = {'hasLoanTenure'}
+
+def readable_class(cls_name):
+    return re.sub(r'([A-Z])', r' \1', cls_name).strip()
+
+def outcome_kind(cls_name):
+    """Same class selection as perform_logical_assessment (e.g. HighDTIApplicant is a rejection)."""
+    if "Approved" in cls_name: return "approval"
+    if "Rejection" in cls_name or "Applicant" in cls_name: return "rejection"
+    return "other"  # eligibility/product classes: reported in margins, never block the advisor
+
+def rule_input(applicant_data, kind):
+    """The values a class of this kind is evaluated against."""
+    if kind != "rejection": return applicant_data
+    return {k: v for k, v in applicant_data.items() if k not in LIVE_UNEVALUATED_PROPS}
+
+def rule_holds(rule, val):
+    if val is None: return False
+    op, target = rule['type'], rule['val']
+    if op == 'hasValue': return val == target
+    if op == 'minInclusive': return val >= target
+    if op == 'maxInclusive': return val <= target
+    if op == 'minExclusive': return val > target
+    if op == 'maxExclusive': return val < target
+    return True
+
+def matched_classes(applicant_data, constraints, kind):
+    """Classes of the given outcome kind whose restrictions all hold for the applicant."""
+    data = rule_input(applicant_data, kind)
+    return [
+        cls_name for cls_name, rules in constraints.items()
+        if outcome_kind(cls_name) == kind and all(rule_holds(r, data.get(r['prop'])) for r in rules)
+    ]
+
+def recommendation(purpose, collateral, amount, age, has_al, is_female, rejected):
+    """Picks the headline product and eligibility score shown by the advisor."""
+    best_loan = f"NSB {purpose} Loan"
+    score = 40 if rejected else 85
+
+    if "FD" in collateral:
+        best_loan = "NSB FD-Backed Loan"
+        score = 98
+    elif "Gold" in collateral and amount < 500000:
+        best_loan = "Pawning / Gold Loan"
+        score = 95
+    elif purpose == "Education" and has_al and age <= 25:
+        best_loan = "Interest Free Student Loan (IFSLS)"
+        score = 92
+    elif purpose == "Personal" and is_female:
+        best_loan = "Vanitha Aruna"
+        score = 90
+    return best_loan, score
+
+def rule_change(rule, val, holds, salary, expenses):
+    """The change that toggles one restriction. An unknown value fails every rule; supplying the target satisfies it."""
+    op, target = rule['type'], rule['val']
+    if val is None:
+        return {"property": rule['prop'], "from": None, "to": target, "facet": op, "categorical": op not in NUMERIC_OPS}
+
+    if op == 'hasValue':
+        if not holds: to = target
+        elif isinstance(target, bool): to = not target
+        else: to = None  # any other value breaks it
+        return {"property": rule['prop'], "from": val, "to": to, "categorical": True}
+    if op not in NUMERIC_OPS: return None
+
+    change = {
+        "property": rule['prop'],
+        "from": val,
+        "to": target,
+        "delta": round(target - val, 6),
+        # Crossing an inclusive bound to satisfy it (or an exclusive one to break it) may land on it
+        "boundary_ok": (op in INCLUSIVE_OPS) != holds,
+        "relative": round(abs(target - val) / max(abs(val), abs(target), 1e-9), 6)
+    }
+    if rule['prop'] == 'hasDTI' and target > 0 and salary > 0:
+        change["via"] = {"income": round(expenses / target, 2), "expenses": round(target * salary, 2)}
+    return change
+
+def margin_analysis(applicant_data, constraints, salary, expenses):
+    """
+    Distance to every restriction boundary, per outcome class, plus the changes that flip it:
+    breaking any one holding rule for a matched class, or satisfying every failing rule otherwise.
+    """
+    report = []
+    for cls_name, rules in constraints.items():
+        kind = outcome_kind(cls_name)
+        data = rule_input(applicant_data, kind)
+        rule_rows = []
+        for rule in rules:
+            val = data.get(rule['prop'])
+            holds = rule_holds(rule, val)
+            row = {"property": rule['prop'], "facet": rule['type'], "target": rule['val'], "value": val, "holds": holds}
+            if rule['type'] in NUMERIC_OPS and val is not None:
+                # Positive slack: how far inside the restriction the applicant sits
+                row["slack"] = round(val - rule['val'] if rule['type'].startswith('min') else rule['val'] - val, 6)
+            # A property the live decision never evaluates for this class cannot be changed to match it
+            live = not (kind == "rejection" and rule['prop'] in LIVE_UNEVALUATED_PROPS)
+            row["change"] = rule_change(rule, val, holds, salary, expenses) if live else None
+            rule_rows.append(row)
+
+        matched = all(r["holds"] for r in rule_rows)
+        if matched:
+            changes = [r["change"] for r in rule_rows if r["change"]]
+            changes.sort(key=lambda c: c.get("relative", float("inf")))
+        else:
+            # Every failing rule has to change; if one of them cannot, no set of changes flips the class
+            unmet = [r["change"] for r in rule_rows if not r["holds"]]
+            changes = unmet if all(unmet) else []
+
+        report.append({
+            "class": cls_name,
+            "label": readable_class(cls_name),
+            "kind": kind,
+            "matched": matched,
+            "rules": rule_rows,
+            "flip": {
+                "requires": "any" if matched else "all",
+                "changes": changes,
+                "minimal": changes[0] if matched and changes else None
+            }
+        })
+    return report
+
+def grid_axes(grid, salary, duration, amount):
+    """Resolves the requested (or default) income/tenure/amount axes."""
+    grid = grid or {}
+    if not isinstance(grid, dict):
+        raise ValueError("Grid must be an object with optional 'income', 'tenure' and 'amount' lists.")
+    axes = {
+        "income": grid.get("income") or sorted({round(salary * s) for s in DEFAULT_INCOME_STEPS}),
+        "tenure": grid.get("tenure") or sorted(set(DEFAULT_TENURES) | ({duration} if duration else set())),
+        "amount": grid.get("amount") or sorted({round(amount * s) for s in DEFAULT_AMOUNT_STEPS})
+    }
+    for name, values in axes.items():
+        if not isinstance(values, list) or not values or len(values) > MAX_AXIS_POINTS:
+            raise ValueError(f"Grid axis '{name}' must list between 1 and {MAX_AXIS_POINTS} values.")
+        if not all(isinstance(v, (int, float)) and not isinstance(v, bool) and v >= 0 for v in values):
+            raise ValueError(f"Grid axis '{name}' must contain non-negative numbers.")
+    return axes
+
+def feasibility_surface(applicant_data, constraints, expenses, axes, profile):
+    """
+    Evaluates every income x tenure x amount combination in one pass. Each rule depends on
+    at most one axis, so it is evaluated once per axis value and the per-class masks are
+    combined point by point, instead of re-running the full rule set for every combination.
+    """
+    incomes, tenures, amounts = axes["income"], axes["tenure"], axes["amount"]
+    data = rule_input(applicant_data, "rejection")
+
+    def axis_data(prop, income=None, tenure=None, amount=None):
+        if prop in LIVE_UNEVALUATED_PROPS: return None
+        if prop == 'hasMonthlyIncome': return income
+        if prop == 'hasDTI': return expenses / income if income > 0 else 0
+        if prop == 'hasLoanTenure': return tenure
+        if prop == 'requestedLoanAmount': return amount
+        return data.get(prop)
+
+    masks = []
+    for cls_name, rules in constraints.items():
+        if outcome_kind(cls_name) != "rejection": continue
+        fixed = all(rule_holds(r, data.get(r['prop'])) for r in rules
+                    if r['prop'] not in INCOME_PROPS | TENURE_PROPS | AMOUNT_PROPS)
+        if not fixed: continue  # never matches anywhere on this grid
+        masks.append((
+            readable_class(cls_name),
+            [all(rule_holds(r, axis_data(r['prop'], income=x)) for r in rules if r['prop'] in INCOME_PROPS) for x in incomes],
+            [all(rule_holds(r, axis_data(r['prop'], tenure=x)) for r in rules if r['prop'] in TENURE_PROPS) for x in tenures],
+            [all(rule_holds(r, axis_data(r['prop'], amount=x)) for r in rules if r['prop'] in AMOUNT_PROPS) for x in amounts]
+        ))
+
+    feasible, score, blocking = [], [], []
+    for i in range(len(incomes)):
+        f_row, s_row, b_row = [], [], []
+        for j in range(len(tenures)):
+            f_cell, s_cell, b_cell = [], [], []
+            for k, amt in enumerate(amounts):
+                blocked = [label for label, m_inc, m_ten, m_amt in masks if m_inc[i] and m_ten[j] and m_amt[k]]
+                f_cell.append(not blocked)
+                s_cell.append(recommendation(amount=amt, rejected=bool(blocked), **profile)[1])
+                b_cell.append(blocked)
+            f_row.append(f_cell); s_row.append(s_cell); b_row.append(b_cell)
+        feasible.append(f_row); score.append(s_row); blocking.append(b_row)
+
+    return {"axes": axes, "feasible": feasible, "score": score, "blocking": blocking}
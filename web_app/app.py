@@ -1,7 +1,23 @@
 import os
+import json
+import time
+import hashlib
+import threading
+import tempfile
 import requests
+try:
+    import fcntl
+except ImportError:
+    fcntl = None  # no cross-process pass lock outside POSIX
 import re
-from flask import Flask, render_template, request, jsonify, redirect, url_for
+import xml.etree.ElementTree as ET
+from datetime import datetime, timezone
+from flask import Flask, render_template, stream_template, request, jsonify, redirect, url_for
+import simulator
+import advisor
+import idempotency
+import sparql_results
+import decision_log
 
 app = Flask(__name__)
 
@@ -10,6 +26,17 @@ FUSEKI_BASE_URL = "http://localhost:3030/SWOE"
 FUSEKI_QUERY_URL = f"{FUSEKI_BASE_URL}/query"
 FUSEKI_UPDATE_URL = f"{FUSEKI_BASE_URL}/update"
 FUSEKI_DATA_URL = f"{FUSEKI_BASE_URL}/data"
+FUSEKI_RESULT_FORMAT = "tsv"  # wire format for streamed result sets (tsv, csv or json)
+
+# Applicant Partitioning
+# Applicants live in one named graph per calendar month; the default graph keeps the TBox
+# (and the seed individuals shipped with the ontology).
+APPLICANT_GRAPH_BASE = "http://www.semanticweb.org/ontology/loan_approval/applicants/"
+DEFAULT_GRAPH_URI = "urn:x-arq:DefaultGraph"  # Jena's name for the default graph
+ACTIVE_PARTITION_MONTHS = 3  # partitions read by the day-to-day views
+ARCHIVE_DIR = os.path.join(os.path.dirname(__file__), "archive")
+ONTOLOGY_PATH = os.path.join(os.path.dirname(__file__), "..", "loan_approval.owl")
+MIGRATE_BATCH_SIZE = 200  # applicants moved per SPARQL update
 
 def perform_logical_assessment(applicant_data):
     """
@@ -85,6 +112,13 @@ def query_fuseki(sparql_query):
         print(f"Fuseki Query Error: {e}")
         return None
 
+def stream_fuseki(sparql_query):
+    """Streams a SELECT from Fuseki as typed rows, for result sets too large to load at once."""
+    try:
+        yield from sparql_results.iter_select(FUSEKI_QUERY_URL, sparql_query, fmt=FUSEKI_RESULT_FORMAT)
+    except Exception as e:
+        print(f"Fuseki Query Error: {e}")
+
 def update_fuseki(sparql_update):
     """Executes a SPARQL UPDATE against the Fuseki endpoint."""
     try:
@@ -100,17 +134,17 @@ def update_fuseki(sparql_update):
 
 def sync_ontology_to_fuseki():
     """Reads the local OWL file and pushes it to Fuseki."""
-    ontology_path = os.path.join(os.path.dirname(__file__), "..", "loan_approval.owl")
-    if not os.path.exists(ontology_path):
+    if not os.path.exists(ONTOLOGY_PATH):
         return False, "Ontology file not found."
     
     try:
-        with open(ontology_path, 'rb') as f:
+        with open(ONTOLOGY_PATH, 'rb') as f:
             data = f.read()
             
-        # Push to Fuseki default graph
+        # Push to Fuseki default graph only, leaving applicant partitions untouched
         response = requests.put(
             FUSEKI_DATA_URL,
+            params={'default': ''},
             data=data,
             headers={'Content-Type': 'application/rdf+xml'}
         )
@@ -119,17 +153,195 @@ def sync_ontology_to_fuseki():
     except Exception as e:
         return False, f"Sync Error: {e}"
 
+def partition_period(moment=None):
+    """Returns the partition key (YYYY-MM) a timestamp belongs to."""
+    moment = moment or datetime.now(timezone.utc)
+    return moment.strftime("%Y-%m")
+
+def partition_graph_uri(period):
+    return f"{APPLICANT_GRAPH_BASE}{period}"
+
+def recent_partition_periods(months=ACTIVE_PARTITION_MONTHS, moment=None):
+    """Lists the current month and the (months - 1) before it, newest first."""
+    moment = moment or datetime.now(timezone.utc)
+    year, month = moment.year, moment.month
+    periods = []
+    for _ in range(months):
+        periods.append(f"{year:04d}-{month:02d}")
+        month -= 1
+        if month == 0:
+            year, month = year - 1, 12
+    return periods
+
+def partition_dataset_clause(months=ACTIVE_PARTITION_MONTHS):
+    """
+    Builds the FROM clauses that scope a query to the TBox plus recent partitions.
+    Jena merges the listed graphs into the query's default graph, so query bodies stay unchanged.
+    """
+    graphs = [DEFAULT_GRAPH_URI] + [partition_graph_uri(p) for p in recent_partition_periods(months)]
+    return "\n    ".join(f"FROM <{g}>" for g in graphs)
+
+def list_partitions():
+    """Returns the applicant partitions currently loaded in Fuseki."""
+    sparql_query = f"""
+    SELECT DISTINCT ?g WHERE {{
+      GRAPH ?g {{ }}
+      FILTER(STRSTARTS(STR(?g), "{APPLICANT_GRAPH_BASE}"))
+    }}
+    ORDER BY ?g
+    """
+    data = query_fuseki(sparql_query)
+    if not data:
+        return []
+    return [b['g']['value'][len(APPLICANT_GRAPH_BASE):] for b in data['results']['bindings']]
+
+def archived_partition_path(period):
+    return os.path.join(ARCHIVE_DIR, f"applicants-{period}.nt")
+
+def list_archived_partitions():
+    if not os.path.isdir(ARCHIVE_DIR):
+        return []
+    return sorted(
+        f[len("applicants-"):-len(".nt")] for f in os.listdir(ARCHIVE_DIR)
+        if f.startswith("applicants-") and f.endswith(".nt")
+    )
+
+def archive_partition(period):
+    """Dumps a partition to a local N-Triples file and drops it from Fuseki."""
+    graph = partition_graph_uri(period)
+    try:
+        response = requests.get(
+            FUSEKI_DATA_URL,
+            params={'graph': graph},
+            headers={'Accept': 'application/n-triples'},
+            stream=True
+        )
+        response.raise_for_status()
+
+        os.makedirs(ARCHIVE_DIR, exist_ok=True)
+        path = archived_partition_path(period)
+        # Write beside the target first so a failed transfer never leaves a truncated archive
+        tmp_path = f"{path}.part"
+        with open(tmp_path, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=65536):
+                f.write(chunk)
+        os.replace(tmp_path, path)
+
+        requests.delete(FUSEKI_DATA_URL, params={'graph': graph}).raise_for_status()
+        return True, f"Archived {period} to {os.path.basename(path)}."
+    except Exception as e:
+        return False, f"Archive Error: {e}"
+
+def restore_partition(period):
+    """Reloads an archived partition into its named graph."""
+    path = archived_partition_path(period)
+    if not os.path.exists(path):
+        return False, f"No archive found for {period}."
+
+    try:
+        with open(path, 'rb') as f:
+            response = requests.post(
+                FUSEKI_DATA_URL,
+                params={'graph': partition_graph_uri(period)},
+                data=f,
+                headers={'Content-Type': 'application/n-triples'}
+            )
+        response.raise_for_status()
+        return True, f"Restored {period} from archive."
+    except Exception as e:
+        return False, f"Restore Error: {e}"
+
+def archive_stale_partitions(months=ACTIVE_PARTITION_MONTHS):
+    """Archives every loaded partition that has fallen out of the active window."""
+    active = set(recent_partition_periods(months))
+    results = []
+    for period in list_partitions():
+        # Future-dated keys (clock skew) sort after the window and are kept live
+        if period in active or period > max(active):
+            continue
+        success, message = archive_partition(period)
+        results.append({"period": period, "success": success, "message": message})
+    return results
+
+def ontology_subjects():
+    """Resources described in the local OWL file; the ontology sync re-creates these in the default graph."""
+    about = "{http://www.w3.org/1999/02/22-rdf-syntax-ns#}about"
+    if not os.path.exists(ONTOLOGY_PATH):
+        return set()
+    return {el.get(about) for _, el in ET.iterparse(ONTOLOGY_PATH) if el.get(about)}
+
+def find_default_graph_applicants():
+    """
+    Applicants stored in the default graph before partitioning, with the partition each belongs to.
+    The period comes from loan:submittedAt; undated applicants go to the current month.
+    Seed individuals from the OWL file stay where they are.
+    """
+    sparql_query = """
+    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    PREFIX loan: <http://www.semanticweb.org/ontology/loan_approval#>
+    SELECT ?applicant (MIN(?submittedAt) AS ?submitted) WHERE {
+      ?applicant rdf:type ?type .
+      ?type rdfs:subClassOf* loan:Applicant .
+      OPTIONAL { ?applicant loan:submittedAt ?submittedAt }
+    }
+    GROUP BY ?applicant
+    ORDER BY ?applicant
+    """
+    data = query_fuseki(sparql_query)
+    if not data:
+        raise RuntimeError("Could not read default-graph applicants from Fuseki.")
+
+    seeds = ontology_subjects()
+    fallback = partition_period()
+    applicants = []
+    for b in data['results']['bindings']:
+        uri = b['applicant']['value']
+        if uri in seeds or b['applicant']['type'] != 'uri':
+            continue
+        period = fallback
+        if 'submitted' in b:
+            try:
+                period = partition_period(datetime.fromisoformat(b['submitted']['value']).astimezone(timezone.utc))
+            except ValueError:
+                pass  # malformed timestamp: treat as undated
+        applicants.append({"applicant": uri, "period": period})
+    return applicants
+
+def migrate_default_graph_applicants(applicants):
+    """Moves applicants and the loans they apply for into their partitions, a batch per SPARQL request."""
+    moved = 0
+    by_period = {}
+    for a in applicants:
+        by_period.setdefault(a['period'], []).append(a['applicant'])
+    for period, uris in sorted(by_period.items()):
+        for i in range(0, len(uris), MIGRATE_BATCH_SIZE):
+            batch = uris[i:i + MIGRATE_BATCH_SIZE]
+            values = " ".join(f"<{u}>" for u in batch)
+            update_query = f"""
+            PREFIX loan: <http://www.semanticweb.org/ontology/loan_approval#>
+            DELETE {{ ?s ?p ?o }}
+            INSERT {{ GRAPH <{partition_graph_uri(period)}> {{ ?s ?p ?o }} }}
+            WHERE {{
+              VALUES ?applicant {{ {values} }}
+              {{ ?applicant ?p ?o BIND(?applicant AS ?s) }}
+              UNION
+              {{ ?applicant loan:appliesFor ?s . ?s ?p ?o }}
+            }}
+            """
+            if not update_fuseki(update_query):
+                return moved
+            moved += len(batch)
+    return moved
+
 # Dynamic Ontology Rule Cache
 ONTOLOGY_CONSTRAINTS = {}
 APPROVED_CLASSES = set()
 REJECTED_CLASSES = set()
+CLASS_FINGERPRINTS = {}  # class name -> hash of its restrictions
+RULESET_GENERATION = ""  # hash over every class fingerprint
 
-def load_ontology_constraints():
-    """Extracts business rules and outcome hierarchies from the Fuseki SPARQL server."""
-    global ONTOLOGY_CONSTRAINTS, APPROVED_CLASSES, REJECTED_CLASSES
-    
-    # 1. Fetch Class Restrictions
-    sparql_query = """
+CONSTRAINTS_QUERY = """
     PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     PREFIX owl: <http://www.w3.org/2002/07/owl#>
@@ -142,23 +354,62 @@ def load_ontology_constraints():
       { ?restriction owl:someValuesFrom ?dt . ?dt owl:withRestrictions/rdf:rest*/rdf:first ?facet . ?facet ?type ?value . }
     }
     """
-    data = query_fuseki(sparql_query)
+
+def parse_constraint_bindings(bindings):
+    """Groups restriction rows from CONSTRAINTS_QUERY into {class: [rule, ...]}."""
+    constraints = {}
+    for b in bindings:
+        cls_name = b['class']['value'].split("#")[-1]
+        prop = b['prop']['value'].split("#")[-1]
+        op = b['type']['value'].split("#")[-1]
+        val_raw = b['value']['value']
+        datatype = b['value'].get('datatype', '')
+        if 'integer' in datatype: val = int(val_raw)
+        elif 'boolean' in datatype: val = val_raw.lower() == 'true'
+        elif 'decimal' in datatype or 'float' in datatype: val = float(val_raw)
+        else: val = val_raw
+        if cls_name not in constraints: constraints[cls_name] = []
+        constraints[cls_name].append({'prop': prop, 'type': op, 'val': val})
+    return constraints
+
+def load_constraints_from_owl(path):
+    """Extracts the same rule set from a local OWL file, without going through Fuseki."""
+    try:
+        import rdflib
+    except ImportError:
+        raise RuntimeError("Reading a candidate OWL file requires rdflib (pip install rdflib).")
+
+    graph = rdflib.Graph()
+    graph.parse(path, format="xml")
+    bindings = []
+    for row in graph.query(CONSTRAINTS_QUERY):
+        value = row['value']
+        bindings.append({
+            'class': {'value': str(row['class'])},
+            'prop': {'value': str(row['prop'])},
+            'type': {'value': str(row['type'])},
+            'value': {'value': str(value), 'datatype': str(getattr(value, 'datatype', None) or '')}
+        })
+    return parse_constraint_bindings(bindings)
+
+def load_ontology_constraints():
+    """Extracts business rules and outcome hierarchies from the Fuseki SPARQL server."""
+    global ONTOLOGY_CONSTRAINTS, APPROVED_CLASSES, REJECTED_CLASSES, CLASS_FINGERPRINTS, RULESET_GENERATION
+    
+    # 1. Fetch Class Restrictions
+    data = query_fuseki(CONSTRAINTS_QUERY)
     constraints = {}
     if data:
-        for b in data['results']['bindings']:
-            cls_name = b['class']['value'].split("#")[-1]
-            prop = b['prop']['value'].split("#")[-1]
-            op = b['type']['value'].split("#")[-1]
-            val_raw = b['value']['value']
-            datatype = b['value'].get('datatype', '')
-            if 'integer' in datatype: val = int(val_raw)
-            elif 'boolean' in datatype: val = val_raw.lower() == 'true'
-            elif 'decimal' in datatype or 'float' in datatype: val = float(val_raw)
-            else: val = val_raw
-            if cls_name not in constraints: constraints[cls_name] = []
-            constraints[cls_name].append({'prop': prop, 'type': op, 'val': val})
+        constraints = parse_constraint_bindings(data['results']['bindings'])
     ONTOLOGY_CONSTRAINTS = constraints
 
+    # Fingerprint each class so rule edits can be traced to the classes they touch
+    CLASS_FINGERPRINTS = {
+        cls_name: hashlib.sha1(json.dumps(sorted(rules, key=lambda r: (r['prop'], r['type'])), sort_keys=True).encode()).hexdigest()[:12]
+        for cls_name, rules in constraints.items()
+    }
+    RULESET_GENERATION = hashlib.sha1(json.dumps(CLASS_FINGERPRINTS, sort_keys=True).encode()).hexdigest()[:12]
+
     # 2. Fetch Outcome Hierarchies
     hierarchy_query = """
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
@@ -182,6 +433,299 @@ try:
 except:
     pass
 
+def assessment_input(info):
+    """Maps a grouped applicant record (raw SPARQL strings or typed rows) to the property names used by the rules."""
+    def get_bool(v):
+        if v is None: return None
+        return str(v).lower() == 'true'
+
+    def get_num(v, cast):
+        if v is None or v == '': return None
+        return cast(v)
+
+    return {
+        "hasAge": get_num(info.get('age'), int),
+        "hasMonthlyIncome": get_num(info.get('income'), int),
+        "hasCRIBScore": get_num(info.get('crib'), int),
+        "hasDTI": get_num(info.get('dti'), float),
+        "isResident": get_bool(info.get('residency')),
+        "isSriLankan": get_bool(info.get('citizenship')),
+        "isPermanentRole": get_bool(info.get('permanent')),
+        "hasPreviousArrears": get_bool(info.get('arrears')),
+        "isRecognizedInstitution": get_bool(info.get('university')),
+        "hasJewelryCollateral": get_bool(info.get('jewelry'))
+    }
+
+# Background Reclassification
+# Applicants without an asserted outcome class get their decision materialized as
+# loan:hasDecision / loan:decisionReason / loan:decisionGeneration, so views stop re-running the rules.
+RECLASSIFY_INTERVAL = 30  # seconds between worker passes
+RECLASSIFY_BATCH_SIZE = 500
+RECLASSIFY_STATE_PATH = os.path.join(os.path.dirname(__file__), "state", "reclassifier.json")
+RECLASSIFY_LOCK = threading.Lock()
+RECLASSIFY_WAKEUP = threading.Event()
+RECLASSIFY_THREAD = None
+RECLASSIFY_START_LOCK = threading.Lock()
+
+RECLASSIFY_FEATURES = """
+        OPTIONAL { ?applicant loan:hasAge ?age }
+        OPTIONAL { ?applicant loan:hasMonthlyIncome ?income }
+        OPTIONAL { ?applicant loan:hasCRIBScore ?crib }
+        OPTIONAL { ?applicant loan:hasDTI ?dti }
+        OPTIONAL { ?applicant loan:isResident ?residency }
+        OPTIONAL { ?applicant loan:isSriLankan ?citizenship }
+        OPTIONAL { ?applicant loan:isPermanentRole ?permanent }
+        OPTIONAL { ?applicant loan:hasPreviousArrears ?arrears }
+        OPTIONAL { ?applicant loan:isRecognizedInstitution ?university }
+        OPTIONAL { ?applicant loan:hasJewelryCollateral ?jewelry }"""
+
+def load_reclassify_state():
+    state = {"watermark": "1970-01-01T00:00:00Z", "generation": "", "class_fingerprints": {}, "pending_classes": []}
+    try:
+        with open(RECLASSIFY_STATE_PATH) as f:
+            state.update(json.load(f))
+    except (OSError, ValueError):
+        pass
+    return state
+
+def save_reclassify_state(state):
+    os.makedirs(os.path.dirname(RECLASSIFY_STATE_PATH), exist_ok=True)
+    tmp_path = f"{RECLASSIFY_STATE_PATH}.tmp"
+    with open(tmp_path, 'w') as f:
+        json.dump(state, f, indent=2)
+    os.replace(tmp_path, RECLASSIFY_STATE_PATH)
+
+def changed_rule_classes(previous, current):
+    """Classes whose restrictions were added, removed or edited between two fingerprint maps."""
+    return {c for c in set(previous) | set(current) if previous.get(c) != current.get(c)}
+
+def readable_class(cls_name):
+    return re.sub(r'([A-Z])', r' \1', cls_name).strip()
+
+def is_rejection_class(cls_name):
+    # Mirrors the class selection in perform_logical_assessment
+    return ("Rejection" in cls_name or "Applicant" in cls_name) and "Approved" not in cls_name
+
+def applicant_scope(body):
+    """
+    Matches body in every applicant partition and in the default graph, binding ?g to where
+    it matched. Applicants stored before partitioning (or loaded by hand) live in the latter.
+    """
+    return f"""{{
+        GRAPH ?g {{ {body} }}
+        FILTER(STRSTARTS(STR(?g), "{APPLICANT_GRAPH_BASE}"))
+      }} UNION {{
+        {body}
+        BIND(<{DEFAULT_GRAPH_URI}> AS ?g)
+      }}"""
+
+# Applicants already carrying an asserted outcome class (in any graph) need no decision
+WITHOUT_OUTCOME = """FILTER NOT EXISTS {
+        { ?applicant rdf:type ?outcomeClass } UNION { GRAPH ?anyGraph { ?applicant rdf:type ?outcomeClass } }
+        ?outcomeClass rdfs:subClassOf* ?outcome .
+        VALUES ?outcome { loan:ApprovedOutcome loan:RejectedOutcome }
+      }"""
+
+def fetch_reclassify_batch(where_clause, order_by=""):
+    """Runs a reclassification selection and returns one assessment row per applicant."""
+    sparql_query = f"""
+    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
+    PREFIX loan: <http://www.semanticweb.org/ontology/loan_approval#>
+    SELECT ?applicant ?g ?submitted ?age ?income ?crib ?dti ?residency ?citizenship ?permanent ?arrears ?university ?jewelry
+    WHERE {{
+      {where_clause}
+    }}
+    {order_by}
+    LIMIT {RECLASSIFY_BATCH_SIZE}
+    """
+    data = query_fuseki(sparql_query)
+    if not data:
+        return []
+
+    rows = {}
+    for b in data['results']['bindings']:
+        uri = b['applicant']['value']
+        if uri in rows: continue
+        rows[uri] = {k: v['value'] for k, v in b.items()}
+    return list(rows.values())
+
+def fetch_unclassified_batch(watermark):
+    """Applicants submitted at or after the watermark with neither an outcome class nor a decision."""
+    body = f"""
+        ?applicant loan:submittedAt ?submitted .
+        FILTER(?submitted >= "{watermark}"^^xsd:dateTime)
+        FILTER NOT EXISTS {{ ?applicant loan:hasDecision ?decided }}
+        {RECLASSIFY_FEATURES}"""
+    where_clause = f"""{applicant_scope(body)}
+      {WITHOUT_OUTCOME}"""
+    return fetch_reclassify_batch(where_clause, order_by="ORDER BY ?submitted ?applicant")
+
+def fetch_undated_batch():
+    """
+    Applicants without loan:submittedAt and without an outcome or decision. The watermark
+    cannot order them, but each batch gets a decision, so the selection drains on its own.
+    """
+    body = f"""
+        ?applicant rdf:type ?applicantType .
+        FILTER NOT EXISTS {{ ?applicant loan:submittedAt ?submitted }}
+        FILTER NOT EXISTS {{ ?applicant loan:hasDecision ?decided }}
+        {RECLASSIFY_FEATURES}"""
+    where_clause = f"""{applicant_scope(body)}
+      ?applicantType rdfs:subClassOf* loan:Applicant .
+      {WITHOUT_OUTCOME}"""
+    return fetch_reclassify_batch(where_clause)
+
+def fetch_affected_batch(changed_classes):
+    """
+    Materialized decisions from an older generation that a rule change can flip:
+    decisions made by a changed class, plus outcomes a changed class could now overturn.
+    """
+    reasons = ", ".join(f'"{readable_class(c)}"' for c in sorted(changed_classes))
+    conditions = [f"?reason IN ({reasons})"]
+    if any(is_rejection_class(c) for c in changed_classes):
+        conditions.append('?decision != "Rejected"')
+    elif any("Approved" in c for c in changed_classes):
+        conditions.append('?decision = "Pending"')
+
+    where_clause = applicant_scope(f"""
+        ?applicant loan:hasDecision ?decision ;
+                   loan:decisionReason ?reason ;
+                   loan:decisionGeneration ?generation .
+        FILTER(?generation != "{RULESET_GENERATION}")
+        FILTER({" || ".join(conditions)})
+        {RECLASSIFY_FEATURES}""")
+    return fetch_reclassify_batch(where_clause)
+
+def in_graph(g, body):
+    """Wraps an update template for the graph it targets; the default graph takes no GRAPH block."""
+    return body if g == DEFAULT_GRAPH_URI else f"GRAPH <{g}> {{ {body} }}"
+
+def write_decisions(decisions):
+    """Replaces the materialized decision triples for a batch in one SPARQL request."""
+    graphs = {}
+    for d in decisions:
+        graphs.setdefault(d['g'], []).append(d)
+
+    statements = []
+    for g, batch in graphs.items():
+        values = " ".join(f"<{d['applicant']}>" for d in batch)
+        old = "?a loan:hasDecision ?d ; loan:decisionReason ?r ; loan:decisionGeneration ?x"
+        new = " . ".join(
+            f'<{d["applicant"]}> loan:hasDecision "{d["decision"]}" ; '
+            f'loan:decisionReason "{d["reason"]}" ; '
+            f'loan:decisionGeneration "{RULESET_GENERATION}"'
+            for d in batch
+        )
+        statements.append(f"DELETE {{ {in_graph(g, old)} }} WHERE {{ VALUES ?a {{ {values} }} {in_graph(g, old)} }}")
+        statements.append(f"INSERT DATA {{ {in_graph(g, new + ' .')} }}")
+
+    update_query = """
+    PREFIX loan: <http://www.semanticweb.org/ontology/loan_approval#>
+    """ + " ;\n    ".join(statements)
+    return update_fuseki(update_query)
+
+def reclassify_rows(rows):
+    decisions = []
+    for row in rows:
+        decision, reason = perform_logical_assessment(assessment_input(row))
+        decisions.append({"applicant": row['applicant'], "g": row['g'], "decision": decision, "reason": reason})
+    return write_decisions(decisions)
+
+def run_reclassification_pass():
+    """
+    Materializes decisions for new applicants, then re-runs the ones a rule change affects.
+    Under a multi-process server only one process runs a pass at a time; the others skip.
+    """
+    with RECLASSIFY_LOCK:
+        os.makedirs(os.path.dirname(RECLASSIFY_STATE_PATH), exist_ok=True)
+        with open(f"{RECLASSIFY_STATE_PATH}.lock", "w") as lock_file:
+            if fcntl:
+                try:
+                    fcntl.flock(lock_file, fcntl.LOCK_EX | fcntl.LOCK_NB)
+                except OSError:
+                    return {"materialized": 0, "reassessed": 0, "generation": RULESET_GENERATION, "skipped": True}
+            return reclassification_pass()
+
+def reclassification_pass():
+    load_ontology_constraints()
+    if not ONTOLOGY_CONSTRAINTS:
+        # Fuseki unreachable or TBox missing; deciding now would mark everyone Pending
+        return {"materialized": 0, "reassessed": 0, "generation": RULESET_GENERATION}
+
+    state = load_reclassify_state()
+    if state['class_fingerprints']:
+        changed = changed_rule_classes(state['class_fingerprints'], CLASS_FINGERPRINTS)
+        state['pending_classes'] = sorted(set(state['pending_classes']) | changed)
+    state['class_fingerprints'] = CLASS_FINGERPRINTS
+    state['generation'] = RULESET_GENERATION
+    save_reclassify_state(state)
+
+    # 1. New applicants since the watermark
+    materialized = 0
+    while True:
+        rows = fetch_unclassified_batch(state['watermark'])
+        if not rows or not reclassify_rows(rows):
+            break
+        materialized += len(rows)
+        state['watermark'] = max(r['submitted'] for r in rows)
+        save_reclassify_state(state)
+        if len(rows) < RECLASSIFY_BATCH_SIZE:
+            break
+
+    # 1b. Applicants with no submission time (default-graph book, hand-loaded data)
+    while True:
+        rows = fetch_undated_batch()
+        if not rows or not reclassify_rows(rows):
+            break
+        materialized += len(rows)
+        if len(rows) < RECLASSIFY_BATCH_SIZE:
+            break
+
+    # 2. Incremental re-run scoped to the classes a rule change touched
+    reassessed = 0
+    if state['pending_classes']:
+        completed = False
+        while True:
+            rows = fetch_affected_batch(state['pending_classes'])
+            if not rows:
+                completed = True
+                break
+            if not reclassify_rows(rows):
+                break
+            reassessed += len(rows)
+        if completed:
+            state['pending_classes'] = []
+            save_reclassify_state(state)
+
+    return {"materialized": materialized, "reassessed": reassessed, "generation": RULESET_GENERATION}
+
+def reclassification_worker():
+    while True:
+        try:
+            run_reclassification_pass()
+        except Exception as e:
+            print(f"Reclassification Error: {e}")
+        RECLASSIFY_WAKEUP.wait(RECLASSIFY_INTERVAL)
+        RECLASSIFY_WAKEUP.clear()
+
+def start_reclassification_worker():
+    """Starts the worker once per process."""
+    global RECLASSIFY_THREAD
+    with RECLASSIFY_START_LOCK:
+        if RECLASSIFY_THREAD is None:
+            RECLASSIFY_THREAD = threading.Thread(target=reclassification_worker, name="reclassifier", daemon=True)
+            RECLASSIFY_THREAD.start()
+    return RECLASSIFY_THREAD
+
+@app.before_request
+def ensure_reclassification_worker():
+    # Started from the first request so it runs in whichever process serves the app
+    # (python app.py, flask run or a WSGI server), never in the reloader's watcher process.
+    if RECLASSIFY_THREAD is None:
+        start_reclassification_worker()
+
 @app.route("/")
 def index():
     return redirect(url_for('dashboard'))
@@ -232,41 +776,114 @@ def get_schemes():
 @app.route("/sync-ontology", methods=["POST"])
 def sync_ontology():
     success, message = sync_ontology_to_fuseki()
+    if success:
+        # Let the worker pick up rule changes without waiting for its next tick
+        RECLASSIFY_WAKEUP.set()
+    return jsonify({"success": success, "message": message})
+
+@app.route("/reclassify", methods=["POST"])
+def reclassify():
+    return jsonify(run_reclassification_pass())
+
+@app.route("/simulate/constraints")
+def simulation_constraints():
+    """Current rule set, as a starting point for an edited what-if copy."""
+    if not ONTOLOGY_CONSTRAINTS: load_ontology_constraints()
+    return jsonify(ONTOLOGY_CONSTRAINTS)
+
+@app.route("/simulate", methods=["POST"])
+def simulate():
+    """Diffs portfolio outcomes between the live rules and a candidate set (JSON or uploaded OWL)."""
+    if not ONTOLOGY_CONSTRAINTS: load_ontology_constraints()
+    try:
+        if 'owl' in request.files:
+            with tempfile.NamedTemporaryFile(suffix=".owl") as tmp:
+                request.files['owl'].save(tmp.name)
+                candidate = load_constraints_from_owl(tmp.name)
+        else:
+            candidate = (request.get_json(silent=True) or {}).get("constraints")
+
+        report = simulator.run_simulation(
+            ONTOLOGY_CONSTRAINTS,
+            candidate,
+            FUSEKI_QUERY_URL,
+            reuse_snapshot=request.args.get("reuse") == "1"
+        )
+        return jsonify(report)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        return jsonify({"error": f"Simulation Error: {e}"}), 500
+
+@app.route("/partitions")
+def partitions():
+    return jsonify({
+        "active": recent_partition_periods(),
+        "loaded": list_partitions(),
+        "archived": list_archived_partitions()
+    })
+
+@app.route("/partitions/archive", methods=["POST"])
+def archive_partitions():
+    return jsonify({"archived": archive_stale_partitions()})
+
+@app.route("/partitions/migrate", methods=["POST"])
+def migrate_partitions():
+    """One-off move of pre-partitioning applicants out of the default graph. Dry run unless ?apply=1."""
+    try:
+        applicants = find_default_graph_applicants()
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 502
+    periods = {}
+    for a in applicants:
+        periods[a['period']] = periods.get(a['period'], 0) + 1
+    report = {"applicants": len(applicants), "periods": periods, "moved": 0}
+    if request.args.get("apply") == "1":
+        report["moved"] = migrate_default_graph_applicants(applicants)
+    return jsonify(report)
+
+@app.route("/partitions/<period>/restore", methods=["POST"])
+def restore_archived_partition(period):
+    if not re.fullmatch(r'\d{4}-\d{2}', period):
+        return jsonify({"success": False, "message": "Period must be YYYY-MM."}), 400
+    success, message = restore_partition(period)
     return jsonify({"success": success, "message": message})
 
 @app.route("/dashboard")
 def dashboard():
+    months = request.args.get('months', ACTIVE_PARTITION_MONTHS, type=int)
     # 1. Fetch data from Fuseki using dynamic class resolution
-    sparql_query = """
+    sparql_query = f"""
     PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     PREFIX loan: <http://www.semanticweb.org/ontology/loan_approval#>
-    SELECT ?applicant ?label ?type ?loanType ?age ?income ?crib ?dti ?residency ?citizenship ?permanent ?arrears
-    WHERE {
+    SELECT ?applicant ?label ?type ?loanType ?age ?income ?crib ?dti ?residency ?citizenship ?permanent ?arrears ?decision
+    {partition_dataset_clause(months)}
+    WHERE {{
       ?applicant rdf:type ?type .
       ?type rdfs:subClassOf* loan:Applicant .
       FILTER(?type != <http://www.w3.org/2002/07/owl#NamedIndividual>)
       
-      OPTIONAL { ?applicant rdfs:label ?label }
-      OPTIONAL { ?applicant loan:hasAge ?age }
-      OPTIONAL { ?applicant loan:hasMonthlyIncome ?income }
-      OPTIONAL { ?applicant loan:hasCRIBScore ?crib }
-      OPTIONAL { ?applicant loan:hasDTI ?dti }
-      OPTIONAL { ?applicant loan:isResident ?residency }
-      OPTIONAL { ?applicant loan:isSriLankan ?citizenship }
-      OPTIONAL { ?applicant loan:isPermanentRole ?permanent }
-      OPTIONAL { ?applicant loan:hasPreviousArrears ?arrears }
-
-      OPTIONAL { 
+      OPTIONAL {{ ?applicant rdfs:label ?label }}
+      OPTIONAL {{ ?applicant loan:hasAge ?age }}
+      OPTIONAL {{ ?applicant loan:hasMonthlyIncome ?income }}
+      OPTIONAL {{ ?applicant loan:hasCRIBScore ?crib }}
+      OPTIONAL {{ ?applicant loan:hasDTI ?dti }}
+      OPTIONAL {{ ?applicant loan:isResident ?residency }}
+      OPTIONAL {{ ?applicant loan:isSriLankan ?citizenship }}
+      OPTIONAL {{ ?applicant loan:isPermanentRole ?permanent }}
+      OPTIONAL {{ ?applicant loan:hasPreviousArrears ?arrears }}
+      OPTIONAL {{ ?applicant loan:hasDecision ?decision }}
+
+      OPTIONAL {{ 
         ?applicant loan:appliesFor ?loan .
         ?loan rdf:type ?loanType .
         ?loanType rdfs:subClassOf* loan:Loan .
         FILTER(?loanType != loan:Loan)
-      }
-    }
+      }}
+    }}
+    ORDER BY ?applicant
     """
-    data = query_fuseki(sparql_query)
-    
     onto_total = 0
     onto_rejected = 0
     onto_approved = 0
@@ -274,87 +891,53 @@ def dashboard():
     
     distribution = {"Housing": 0, "Personal": 0, "Education": 0}
     
-    if data:
-        bindings = data.get('results', {}).get('bindings', [])
-        applicant_map = {}
-        for b in bindings:
-            uri = b['applicant']['value']
-            if uri not in applicant_map:
-                applicant_map[uri] = {
-                    'name': b.get('label', {}).get('value') or uri.split("#")[-1],
-                    'types': set(),
-                    'loans': set(),
-                    'age': b.get('age', {}).get('value'),
-                    'income': b.get('income', {}).get('value'),
-                    'crib': b.get('crib', {}).get('value'),
-                    'dti': b.get('dti', {}).get('value'),
-                    'residency': b.get('residency', {}).get('value'),
-                    'citizenship': b.get('citizenship', {}).get('value'),
-                    'permanent': b.get('permanent', {}).get('value'),
-                    'arrears': b.get('arrears', {}).get('value')
-                }
-            applicant_map[uri]['types'].add(b['type']['value'])
-            if 'loanType' in b:
-                applicant_map[uri]['loans'].add(b['loanType']['value'])
-
-        onto_total = len(applicant_map)
+    # Rows arrive ordered by applicant, so each one is counted as soon as its group is complete
+    for info in group_applicant_rows(stream_fuseki(sparql_query)):
+        onto_total += 1
+        types = info['types']
+        status_val = "Pending"
+        name = info['name']
         
-        for uri, info in applicant_map.items():
-            types = info['types']
-            status_val = "Pending"
-            name = info['name']
-            
-            # Hierarchical Status Detection
-            is_approved = any(t in APPROVED_CLASSES for t in types)
-            is_rejected = any(t in REJECTED_CLASSES for t in types)
-            
-            if is_approved:
-                status_val = "Approved"
-            elif is_rejected:
-                status_val = "Rejected"
-            else:
-                # 1b. Logical Proxy Fallback for Dashboard Counts
-                def get_bool(v):
-                    if v is None: return None
-                    return str(v).lower() == 'true'
-
-                app_data = {
-                    "hasAge": int(info['age']) if info.get('age') else None,
-                    "hasMonthlyIncome": int(info['income']) if info.get('income') else None,
-                    "hasCRIBScore": int(info['crib']) if info.get('crib') else None,
-                    "hasDTI": float(info['dti']) if info.get('dti') else None,
-                    "isResident": get_bool(info.get('residency')),
-                    "isSriLankan": get_bool(info.get('citizenship')),
-                    "isPermanentRole": get_bool(info.get('permanent')),
-                    "hasPreviousArrears": get_bool(info.get('arrears'))
-                }
-                status_val, _ = perform_logical_assessment(app_data)
-
-            if status_val == "Approved":
-                onto_approved += 1
-            elif status_val == "Rejected":
-                onto_rejected += 1
-            else:
-                onto_pending += 1
-
-            # Dynamic Loan Category Mapping
-            found_category = False
-            for lt in info['loans']:
-                if "Housing" in lt or "Ithurum" in lt or "Siri" in lt:
-                    distribution["Housing"] += 1
-                    found_category = True
-                    break
-                elif "Education" in lt or "StudentLoan" in lt:
-                    distribution["Education"] += 1
-                    found_category = True
-                    break
-                elif "Personal" in lt or "Gold" in lt or "DiviDiriya" in lt or "VanithaAruna" in lt:
-                    distribution["Personal"] += 1
-                    found_category = True
-                    break
-            
-            if not found_category:
+        # Hierarchical Status Detection
+        is_approved = any(t in APPROVED_CLASSES for t in types)
+        is_rejected = any(t in REJECTED_CLASSES for t in types)
+        
+        if is_approved:
+            status_val = "Approved"
+        elif is_rejected:
+            status_val = "Rejected"
+        elif info['decision']:
+            # 1b. Decision materialized by the reclassification worker
+            status_val = info['decision']
+        else:
+            # 1c. Logical Proxy Fallback for applicants the worker has not reached yet
+            status_val, _ = perform_logical_assessment(assessment_input(info))
+
+        if status_val == "Approved":
+            onto_approved += 1
+        elif status_val == "Rejected":
+            onto_rejected += 1
+        else:
+            onto_pending += 1
+
+        # Dynamic Loan Category Mapping
+        found_category = False
+        for lt in info['loans']:
+            if "Housing" in lt or "Ithurum" in lt or "Siri" in lt:
+                distribution["Housing"] += 1
+                found_category = True
+                break
+            elif "Education" in lt or "StudentLoan" in lt:
+                distribution["Education"] += 1
+                found_category = True
+                break
+            elif "Personal" in lt or "Gold" in lt or "DiviDiriya" in lt or "VanithaAruna" in lt:
                 distribution["Personal"] += 1
+                found_category = True
+                break
+        
+        if not found_category:
+            distribution["Personal"] += 1
 
     # Fetch dynamic metadata
     meta_query = """
@@ -392,190 +975,206 @@ def dashboard():
 def applicant():
     return render_template("applicant.html")
 
-@app.route("/status")
-def status():
-    sparql_query = """
+STATUS_STREAM_CHUNK = 25  # applicant cards flushed to the browser per template chunk
+
+def group_applicant_rows(rows):
+    """
+    Folds consecutive result rows into one record per applicant.
+    Expects the rows ordered by applicant so each group is contiguous.
+    """
+    current_uri = None
+    info = None
+    for row in rows:
+        uri = row['applicant']
+        if uri != current_uri:
+            if info is not None:
+                yield info
+            current_uri = uri
+            info = {
+                'name': row.get('label') or uri.split("#")[-1],
+                'types': set(),
+                'loans': set(),
+                'age': row.get('age'),
+                'income': row.get('income'),
+                'crib': row.get('crib'),
+                'dti': row.get('dti'),
+                'residency': row.get('residency'),
+                'citizenship': row.get('citizenship'),
+                'permanent': row.get('permanent'),
+                'arrears': row.get('arrears'),
+                'university': row.get('university'),
+                'jewelry': row.get('jewelry'),
+                'amount': row.get('amount'),
+                'tenure': row.get('tenure'),
+                'purpose': row.get('purpose'),
+                'decision': row.get('decision'),
+                'decision_reason': row.get('decisionReason')
+            }
+        info['types'].add(row['type'])
+        if 'loanType' in row:
+            info['loans'].add(row['loanType'])
+    if info is not None:
+        yield info
+
+def build_case_record(info):
+    """Turns a grouped applicant into the case manager card payload."""
+    name = info['name']
+    types = info['types']
+
+    # 1. Hierarchical Status Detection
+    status_val = "Pending"
+    reason = "Awaiting Reasoning Outcome"
+
+    relevant_rejections = [t for t in types if t in REJECTED_CLASSES]
+    relevant_approvals = [t for t in types if t in APPROVED_CLASSES]
+
+    if relevant_approvals:
+        status_val = "Approved"
+        reason = "Met all ontological safety and eligibility criteria."
+    elif relevant_rejections:
+        status_val = "Rejected"
+        spec_rej = relevant_rejections[0].split("#")[-1]
+        reason = re.sub(r'([A-Z])', r' \1', spec_rej).strip()
+    elif info['decision']:
+        # 1b. Decision materialized by the reclassification worker
+        status_val = info['decision']
+        reason = info['decision_reason'] or reason
+    else:
+        # 1c. Fallback to Logical Proxy for applicants the worker has not reached yet
+        status_val, reason = perform_logical_assessment(assessment_input(info))
+
+    # 2. Dynamic Employment and Loan type
+    emp_type = "Applicant"
+    for et in ["SalariedEmployee", "SelfEmployed", "Retiree", "Student"]:
+        if any(et in t for t in types):
+            emp_type = et
+            break
+
+    loan_type_str = sorted(info['loans'])[0].split("#")[-1] if info['loans'] else "General"
+
+    # 3. Data Formatting
+    res = info['residency']
+    cit = info['citizenship']
+
+    return {
+        "name": name,
+        "loanType": loan_type_str,
+        "diagnosis": status_val,
+        "category": reason,
+        "details": {
+            "age": str(info['age']) if info['age'] is not None else "N/A",
+            "income": f"LKR {int(info['income']):,}" if info['income'] is not None else "N/A",
+            "crib": str(info['crib']) if info['crib'] is not None else "Not Checked",
+            "dti": f"{float(info['dti'])*100:.1f}%" if info['dti'] is not None else "N/A",
+            "residency": "Resident" if str(res).lower() == "true" else "Non-Resident",
+            "citizenship": "Sri Lankan" if str(cit).lower() == "true" else "Other",
+            "employment": emp_type.replace("Employee", " Employee"),
+            "requested": f"LKR {int(info['amount']):,}" if info.get('amount') is not None else "N/A",
+            "tenure": f"{info['tenure']} Months" if info.get('tenure') is not None else "N/A",
+            "purpose": info.get('purpose') or "General Finance"
+        },
+        "source": "Ontology"
+    }
+
+def iter_case_records(months=ACTIVE_PARTITION_MONTHS):
+    """Yields case manager records in name order, decoded row by row off the SPARQL stream."""
+    # Sorting is pushed into ORDER BY so rows arrive grouped by applicant
+    # and records can be rendered as soon as each group is complete.
+    sparql_query = f"""
     PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     PREFIX loan: <http://www.semanticweb.org/ontology/loan_approval#>
-    SELECT ?applicant ?label ?type ?age ?income ?crib ?dti ?residency ?citizenship ?loanType ?permanent ?arrears ?university ?jewelry ?amount ?tenure ?purpose
-    WHERE {
+    SELECT ?applicant ?label ?type ?age ?income ?crib ?dti ?residency ?citizenship ?loanType ?permanent ?arrears ?university ?jewelry ?amount ?tenure ?purpose ?decision ?decisionReason
+    {partition_dataset_clause(months)}
+    WHERE {{
       ?applicant rdf:type ?type .
       ?type rdfs:subClassOf* loan:Applicant .
       FILTER(?type != <http://www.w3.org/2002/07/owl#NamedIndividual>)
       
-      OPTIONAL { ?applicant rdfs:label ?label }
-      OPTIONAL { ?applicant loan:hasAge ?age }
-      OPTIONAL { ?applicant loan:hasMonthlyIncome ?income }
-      OPTIONAL { ?applicant loan:hasCRIBScore ?crib }
-      OPTIONAL { ?applicant loan:hasDTI ?dti }
-      OPTIONAL { ?applicant loan:isResident ?residency }
-      OPTIONAL { ?applicant loan:isSriLankan ?citizenship }
-      OPTIONAL { ?applicant loan:isPermanentRole ?permanent }
-      OPTIONAL { ?applicant loan:hasPreviousArrears ?arrears }
-      OPTIONAL { ?applicant loan:isRecognizedInstitution ?university }
-      OPTIONAL { ?applicant loan:hasJewelryCollateral ?jewelry }
+      OPTIONAL {{ ?applicant rdfs:label ?label }}
+      OPTIONAL {{ ?applicant loan:hasAge ?age }}
+      OPTIONAL {{ ?applicant loan:hasMonthlyIncome ?income }}
+      OPTIONAL {{ ?applicant loan:hasCRIBScore ?crib }}
+      OPTIONAL {{ ?applicant loan:hasDTI ?dti }}
+      OPTIONAL {{ ?applicant loan:isResident ?residency }}
+      OPTIONAL {{ ?applicant loan:isSriLankan ?citizenship }}
+      OPTIONAL {{ ?applicant loan:isPermanentRole ?permanent }}
+      OPTIONAL {{ ?applicant loan:hasPreviousArrears ?arrears }}
+      OPTIONAL {{ ?applicant loan:isRecognizedInstitution ?university }}
+      OPTIONAL {{ ?applicant loan:hasJewelryCollateral ?jewelry }}
+      OPTIONAL {{ ?applicant loan:hasDecision ?decision ; loan:decisionReason ?decisionReason }}
       
-      OPTIONAL { 
+      OPTIONAL {{ 
         ?applicant loan:appliesFor ?loan . 
         ?loan rdf:type ?loanType . 
         ?loanType rdfs:subClassOf* loan:Loan . 
         FILTER(?loanType != loan:Loan)
         
-        OPTIONAL { ?loan loan:requestedLoanAmount ?amount }
-        OPTIONAL { ?loan loan:hasLoanTenure ?tenure }
-        OPTIONAL { ?loan rdfs:label ?purpose }
-      }
-    }
+        OPTIONAL {{ ?loan loan:requestedLoanAmount ?amount }}
+        OPTIONAL {{ ?loan loan:hasLoanTenure ?tenure }}
+        OPTIONAL {{ ?loan rdfs:label ?purpose }}
+      }}
+      BIND(COALESCE(STR(?label), STRAFTER(STR(?applicant), "#")) AS ?sortName)
+    }}
+    ORDER BY ?sortName ?applicant
     """
-    data = query_fuseki(sparql_query)
-    ontology_history = []
-    
-    if data:
-        bindings = data.get('results', {}).get('bindings', [])
-        applicant_map = {}
-        for b in bindings:
-            uri = b['applicant']['value']
-            if uri not in applicant_map:
-                applicant_map[uri] = {
-                    'name': b.get('label', {}).get('value') or uri.split("#")[-1],
-                    'types': set(),
-                    'loans': set(),
-                    'age': b.get('age', {}).get('value'),
-                    'income': b.get('income', {}).get('value'),
-                    'crib': b.get('crib', {}).get('value'),
-                    'dti': b.get('dti', {}).get('value'),
-                    'residency': b.get('residency', {}).get('value'),
-                    'citizenship': b.get('citizenship', {}).get('value'),
-                    'permanent': b.get('permanent', {}).get('value'),
-                    'arrears': b.get('arrears', {}).get('value'),
-                    'university': b.get('university', {}).get('value'),
-                    'jewelry': b.get('jewelry', {}).get('value'),
-                    'amount': b.get('amount', {}).get('value'),
-                    'tenure': b.get('tenure', {}).get('value'),
-                    'purpose': b.get('purpose', {}).get('value')
-                }
-            applicant_map[uri]['types'].add(b['type']['value'])
-            if 'loanType' in b:
-                applicant_map[uri]['loans'].add(b['loanType']['value'])
-
-        for uri, info in applicant_map.items():
-            name = info['name']
-            types = info['types']
-            
-            # 1. Hierarchical Status Detection
-            status_val = "Pending"
-            reason = "Awaiting Reasoning Outcome"
-            
-            relevant_rejections = [t for t in types if t in REJECTED_CLASSES]
-            relevant_approvals = [t for t in types if t in APPROVED_CLASSES]
-            
-            if relevant_approvals:
-                status_val = "Approved"
-                reason = "Met all ontological safety and eligibility criteria."
-            elif relevant_rejections:
-                status_val = "Rejected"
-                spec_rej = relevant_rejections[0].split("#")[-1]
-                import re
-                reason = re.sub(r'([A-Z])', r' \1', spec_rej).strip()
-            else:
-                # 1b. Fallback to Logical Proxy for individual data
-                def get_bool(v):
-                    if v is None: return None
-                    return str(v).lower() == 'true'
-
-                app_data = {
-                    "hasAge": int(info['age']) if info['age'] else None,
-                    "hasMonthlyIncome": int(info['income']) if info['income'] else None,
-                    "hasCRIBScore": int(info['crib']) if info['crib'] else None,
-                    "hasDTI": float(info['dti']) if info['dti'] else None,
-                    "isResident": get_bool(info.get('residency')),
-                    "isSriLankan": get_bool(info.get('citizenship')),
-                    "isPermanentRole": get_bool(info.get('permanent')),
-                    "hasPreviousArrears": get_bool(info.get('arrears')),
-                    "isRecognizedInstitution": get_bool(info.get('university')),
-                    "hasJewelryCollateral": get_bool(info.get('jewelry'))
-                }
-                status_val, reason = perform_logical_assessment(app_data)
-            
-            # 2. Dynamic Employment and Loan type
-            emp_type = "Applicant"
-            for et in ["SalariedEmployee", "SelfEmployed", "Retiree", "Student"]:
-                if any(et in t for t in types):
-                    emp_type = et
-                    break
-            
-            loan_type_str = list(info['loans'])[0].split("#")[-1] if info['loans'] else "General"
+    for info in group_applicant_rows(stream_fuseki(sparql_query)):
+        yield build_case_record(info)
 
-            # 3. Data Formatting
-            res = info['residency']
-            cit = info['citizenship']
-            
-            ontology_history.append({
-                "name": name,
-                "loanType": loan_type_str,
-                "diagnosis": status_val,
-                "category": reason,
-                "details": {
-                    "age": str(info['age']) if info['age'] else "N/A",
-                    "income": f"LKR {int(info['income']):,}" if info['income'] else "N/A",
-                    "crib": str(info['crib']) if info['crib'] else "Not Checked",
-                    "dti": f"{float(info['dti'])*100:.1f}%" if info['dti'] else "N/A",
-                    "residency": "Resident" if str(res).lower() == "true" else "Non-Resident",
-                    "citizenship": "Sri Lankan" if str(cit).lower() == "true" else "Other",
-                    "employment": emp_type.replace("Employee", " Employee"),
-                    "requested": f"LKR {int(info['amount']):,}" if info.get('amount') else "N/A",
-                    "tenure": f"{info['tenure']} Months" if info.get('tenure') else "N/A",
-                    "purpose": info.get('purpose') or "General Finance"
-                },
-                "source": "Ontology"
-            })
-
-    full_history = ontology_history
-    full_history.sort(key=lambda x: x.get('name'))
-
-    return render_template("status.html", history=full_history)
+@app.route("/status")
+def status():
+    # Layout goes out immediately; applicant cards follow in chunks as the
+    # generator decodes them, so the first byte no longer waits on the full book.
+    months = request.args.get('months', ACTIVE_PARTITION_MONTHS, type=int)
+    return stream_template("status.html", history=iter_case_records(months), chunk_size=STATUS_STREAM_CHUNK)
 
 @app.route("/predictor")
 def predictor():
     return render_template("predictor.html")
 
-@app.route("/evaluate", methods=["POST"])
-def evaluate():
-    data = request.json
-    
-    # 1. Extraction from Nested Structure
-    meta = data.get("meta", {})
-    prof = data.get("professional", {})
-    fin = data.get("financial", {})
-    loan_p = data.get("loan", {})
-    dyn = data.get("dynamic", {})
+EMPLOYMENT_CLASSES = {"Salaried": "SalariedEmployee", "Self-Employed": "SelfEmployed", "Retired": "Retiree", "Student": "Student"}
+OPTIONAL_FLAGS = ["hasPensionProof", "hasAL3Passes", "isRecognizedInstitution", "hasJewelryCollateral", "hasClearTitle"]
 
-    name = meta.get("name", "Unknown Applicant")
-    
-    # Map raw data to property names used in OWL
-    applicant_data = {
-        "isSriLankan": meta.get("isSriLankan", True),
-        "isResident": meta.get("residency") == "Resident",
-        "hasMonthlyIncome": int(fin.get("income", 0)),
-        "hasDTI": float(fin.get("dti", 0.0)),
-        "hasCRIBScore": int(fin.get("crib", 0)),
-        "hasPreviousArrears": fin.get("hasArrears", False),
-        "isPermanentRole": prof.get("isPermanent", True),
-        "hasAL3Passes": dyn.get("alPasses", False),
-        "isRecognizedInstitution": dyn.get("isRecognized", False),
-        "hasClearTitle": dyn.get("clearTitle", False),
-        "requestedLoanAmount": int(loan_p.get("amount", 0)),
-        "hasJewelryCollateral": dyn.get("hasJewelry", False),
-        "hasPensionProof": prof.get("type") == "Retired"
+def submission_fields(name, age, applicant_data, emp_class, loan_class, tenure):
+    """Normalized view of a submission as it is persisted; shared by /evaluate and the store dedup pass."""
+    def as_bool(v):
+        return str(v).lower() == 'true'
+
+    def as_int(v):
+        # The form sends '' when a field could not be derived (e.g. an unparsable DOB);
+        # fingerprint the raw value rather than fail a submission the assessment accepts
+        try:
+            return int(v)
+        except (TypeError, ValueError):
+            return v
+
+    return {
+        "name": idempotency.normalize_name(name),
+        "age": as_int(age),
+        "income": int(applicant_data['hasMonthlyIncome']),
+        "dti": float(applicant_data['hasDTI']),
+        "crib": int(applicant_data['hasCRIBScore']),
+        "resident": as_bool(applicant_data['isResident']),
+        "citizen": as_bool(applicant_data['isSriLankan']),
+        "arrears": as_bool(applicant_data['hasPreviousArrears']),
+        "permanent": as_bool(applicant_data['isPermanentRole']),
+        "flags": sorted(f for f in OPTIONAL_FLAGS if applicant_data.get(f) and str(applicant_data[f]).lower() != 'false'),
+        "employment": emp_class,
+        "loan": loan_class,
+        "amount": int(applicant_data['requestedLoanAmount']),
+        "tenure": as_int(tenure)
     }
 
+def assess_and_store(name, age, applicant_data, emp_class, loan_sub_type, loan_class, tenure):
+    """Runs the rejection rules, asserts the applicant and loan individuals, and returns (result, stored)."""
+    started = time.perf_counter()
     diagnosis = "Approved"
     category = "Eligible"
     details = []
 
-    # 2. Dynamic Evaluation using Ontology Constraints (Logical Proxy)
+    # 1. Dynamic Evaluation using Ontology Constraints (Logical Proxy)
     rejections_found = []
+    matched_restrictions = []
     if not ONTOLOGY_CONSTRAINTS: load_ontology_constraints()
     
     for rej_class, rules in ONTOLOGY_CONSTRAINTS.items():
@@ -607,6 +1206,7 @@ def evaluate():
             if not matches_all_rules: break
             
         if matches_all_rules:
+            matched_restrictions.append(rej_class)
             readable_rej = re.sub(r'([A-Z])', r' \1', rej_class).strip()
             rejections_found.append(readable_rej)
             details.append(f"Fails '{readable_rej}' restriction.")
@@ -614,8 +1214,9 @@ def evaluate():
     if rejections_found:
         diagnosis = "Rejected"
         category = rejections_found[0]
+    evaluated = time.perf_counter()
     
-    # 3. Persistent Storage via SPARQL UPDATE
+    # 2. Persistent Storage via SPARQL UPDATE
     import uuid
     app_id = f"App_{uuid.uuid4().hex[:8]}"
     
@@ -624,11 +1225,7 @@ def evaluate():
     rdf_types = ["loan:Applicant"]
     
     # Add employment type as a class
-    emp_type = prof.get("type", "Salaried")
-    if emp_type == "Salaried": rdf_types.append("loan:SalariedEmployee")
-    elif emp_type == "Self-Employed": rdf_types.append("loan:SelfEmployed")
-    elif emp_type == "Retired": rdf_types.append("loan:Retiree")
-    elif emp_type == "Student": rdf_types.append("loan:Student")
+    if emp_class: rdf_types.append(f"loan:{emp_class}")
 
     if diagnosis == "Rejected" and rejections_found:
         # Use first rejection class for direct typing
@@ -638,10 +1235,12 @@ def evaluate():
         rdf_types.append("loan:ApprovedApplicant")
 
     # Construct Triples for Applicant
+    submitted_at = datetime.now(timezone.utc)
     triples = [
         f'loan:{app_id} rdf:type {", ".join(rdf_types)}',
         f'loan:{app_id} rdfs:label "{name}"',
-        f'loan:{app_id} loan:hasAge {meta.get("age", 30)}',
+        f'loan:{app_id} loan:submittedAt "{submitted_at.strftime("%Y-%m-%dT%H:%M:%SZ")}"^^xsd:dateTime',
+        f'loan:{app_id} loan:hasAge {age}',
         f"loan:{app_id} loan:hasMonthlyIncome {applicant_data['hasMonthlyIncome']}",
         f"loan:{app_id} loan:hasDTI {applicant_data['hasDTI']}",
         f"loan:{app_id} loan:hasCRIBScore {applicant_data['hasCRIBScore']}",
@@ -665,18 +1264,11 @@ def evaluate():
 
     # Create a Loan individual
     loan_id = f"Loan_{uuid.uuid4().hex[:8]}"
-    loan_type = loan_p.get("type", "Personal")
-    loan_sub_type = loan_p.get("subType", f"{loan_type} Loan")
-    
-    # Map subType to ontology class if possible, else use parent type
-    onto_loan_class = f"loan:{loan_sub_type.replace(' ', '')}"
-    if "Loan" not in onto_loan_class: onto_loan_class += "Loan"
-
     loan_triples = [
-        f'loan:{loan_id} rdf:type {onto_loan_class}',
+        f'loan:{loan_id} rdf:type loan:{loan_class}',
         f'loan:{loan_id} rdfs:label "{loan_sub_type} for {name}"',
         f'loan:{loan_id} loan:requestedLoanAmount {applicant_data["requestedLoanAmount"]}',
-        f'loan:{loan_id} loan:hasLoanTenure {loan_p.get("tenure", 60)}'
+        f'loan:{loan_id} loan:hasLoanTenure {tenure}'
     ]
 
     # Link Applicant to Loan
@@ -686,19 +1278,248 @@ def evaluate():
     PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
     PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
     PREFIX loan: <http://www.semanticweb.org/ontology/loan_approval#>
+    PREFIX xsd: <http://www.w3.org/2001/XMLSchema#>
     INSERT DATA {{
-      { " . ".join(triples) } .
-      { " . ".join(loan_triples) } .
+      GRAPH <{partition_graph_uri(partition_period(submitted_at))}> {{
+        { " . ".join(triples) } .
+        { " . ".join(loan_triples) } .
+      }}
     }}
     """
-    update_fuseki(update_query)
+    persisting = time.perf_counter()
+    stored = update_fuseki(update_query)
 
-    return jsonify({
+    # 3. Audit trail: full input and every matched restriction, kept locally
+    decision_log.append({
+        "ts": int(submitted_at.timestamp() * 1000),
+        "applicant_id": app_id,
+        "loan_id": loan_id,
+        "generation": RULESET_GENERATION,
         "diagnosis": diagnosis,
         "category": category,
-        "details": details
+        "matched": matched_restrictions,
+        "eval_ms": (evaluated - started) * 1000,
+        "store_ms": (time.perf_counter() - persisting) * 1000,
+        "stored": stored,
+        "employment": emp_class,
+        "loan_class": loan_class,
+        "hasAge": age,
+        "hasLoanTenure": tenure,
+        **applicant_data
     })
 
+    result = {
+        "diagnosis": diagnosis,
+        "category": category,
+        "details": details,
+        "applicant_id": app_id,
+        "loan_id": loan_id
+    }
+    return result, stored
+
+
+@app.route("/evaluate", methods=["POST"])
+def evaluate():
+    data = request.json
+    
+    # 1. Extraction from Nested Structure
+    meta = data.get("meta", {})
+    prof = data.get("professional", {})
+    fin = data.get("financial", {})
+    loan_p = data.get("loan", {})
+    dyn = data.get("dynamic", {})
+
+    name = meta.get("name", "Unknown Applicant")
+    
+    # Map raw data to property names used in OWL
+    applicant_data = {
+        "isSriLankan": meta.get("isSriLankan", True),
+        "isResident": meta.get("residency") == "Resident",
+        "hasMonthlyIncome": int(fin.get("income", 0)),
+        "hasDTI": float(fin.get("dti", 0.0)),
+        "hasCRIBScore": int(fin.get("crib", 0)),
+        "hasPreviousArrears": fin.get("hasArrears", False),
+        "isPermanentRole": prof.get("isPermanent", True),
+        "hasAL3Passes": dyn.get("alPasses", False),
+        "isRecognizedInstitution": dyn.get("isRecognized", False),
+        "hasClearTitle": dyn.get("clearTitle", False),
+        "requestedLoanAmount": int(loan_p.get("amount", 0)),
+        "hasJewelryCollateral": dyn.get("hasJewelry", False),
+        "hasPensionProof": prof.get("type") == "Retired"
+    }
+
+    # Ontology classes the individuals will be typed with
+    emp_class = EMPLOYMENT_CLASSES.get(prof.get("type", "Salaried"))
+    loan_type = loan_p.get("type", "Personal")
+    loan_sub_type = loan_p.get("subType", f"{loan_type} Loan")
+    
+    # Map subType to ontology class if possible, else use parent type
+    loan_class = loan_sub_type.replace(' ', '')
+    if "Loan" not in loan_class: loan_class += "Loan"
+    age = meta.get("age", 30)
+    tenure = loan_p.get("tenure", 60)
+
+    # 2. Deduplication: retries and resubmissions replay the result already issued
+    submission = idempotency.fingerprint(submission_fields(name, age, applicant_data, emp_class, loan_class, tenure))
+    idem_key = request.headers.get("Idempotency-Key")
+    status, cached = idempotency.claim(submission, idem_key)
+    if status == "conflict":
+        return jsonify({"error": "Idempotency-Key was already used for a different application."}), 422
+    if status == "pending":
+        return jsonify({"error": "An identical application is still being processed; retry shortly."}), 409
+    if status == "replay":
+        return jsonify(cached), 200, {"Idempotent-Replayed": "true"}
+
+    # 3. Assessment and Storage
+    keys = idempotency.submission_keys(submission, idem_key)
+    try:
+        result, stored = assess_and_store(name, age, applicant_data, emp_class, loan_sub_type, loan_class, tenure)
+    except Exception:
+        idempotency.release(keys, submission)
+        raise
+    if stored:
+        idempotency.remember(keys, submission, result)
+    else:
+        idempotency.release(keys, submission)  # nothing was stored: a retry should assess again
+
+    return jsonify(result)
+
+DEDUP_PAGE_SIZE = 2000
+DEDUP_DELETE_BATCH = 200
+
+def fetch_submission_page(offset):
+    """
+    One page of stored submissions with the fields submission_fields needs: undated ones
+    (stored before loan:submittedAt existed) first, then oldest first. Covers the default graph too.
+    """
+    flags = "\n        ".join(f"OPTIONAL {{ ?applicant loan:{f} ?{f} }}" for f in OPTIONAL_FLAGS)
+    employment = " ".join(f"loan:{c}" for c in EMPLOYMENT_CLASSES.values())
+    body = f"""
+        ?applicant rdfs:label ?name ;
+                   loan:hasAge ?age ;
+                   loan:hasMonthlyIncome ?income ;
+                   loan:hasDTI ?dti ;
+                   loan:hasCRIBScore ?crib ;
+                   loan:isResident ?resident ;
+                   loan:isSriLankan ?citizen ;
+                   loan:hasPreviousArrears ?arrears ;
+                   loan:isPermanentRole ?permanent ;
+                   loan:appliesFor ?loan .
+        ?loan rdf:type ?loanType ;
+              loan:requestedLoanAmount ?amount ;
+              loan:hasLoanTenure ?tenure .
+        OPTIONAL {{ ?applicant loan:submittedAt ?submitted }}
+        {flags}
+        OPTIONAL {{ ?applicant rdf:type ?empType . VALUES ?empType {{ {employment} }} }}"""
+    sparql_query = f"""
+    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    PREFIX loan: <http://www.semanticweb.org/ontology/loan_approval#>
+    SELECT ?applicant ?g ?submitted ?name ?age ?income ?dti ?crib ?resident ?citizen ?arrears ?permanent
+           {" ".join(f"?{f}" for f in OPTIONAL_FLAGS)} ?empType ?loan ?loanType ?amount ?tenure
+    WHERE {{
+      {applicant_scope(body)}
+    }}
+    ORDER BY ?submitted ?applicant
+    LIMIT {DEDUP_PAGE_SIZE}
+    OFFSET {offset}
+    """
+    data = query_fuseki(sparql_query)
+    return data['results']['bindings'] if data else None
+
+def stored_submission_fingerprint(row):
+    """Fingerprint of a stored submission, computed exactly as /evaluate does for a new one."""
+    applicant_data = {
+        "hasMonthlyIncome": row['income'],
+        "hasDTI": row['dti'],
+        "hasCRIBScore": row['crib'],
+        "isResident": row['resident'],
+        "isSriLankan": row['citizen'],
+        "hasPreviousArrears": row['arrears'],
+        "isPermanentRole": row['permanent'],
+        "requestedLoanAmount": row['amount']
+    }
+    for flag in OPTIONAL_FLAGS:
+        applicant_data[flag] = row.get(flag)
+    emp_class = row['empType'].split('#')[-1] if 'empType' in row else None
+    fields = submission_fields(row['name'], row['age'], applicant_data, emp_class, row['loanType'].split('#')[-1], row['tenure'])
+    return idempotency.fingerprint(fields)
+
+def find_duplicate_submissions():
+    """
+    Walks the stored submissions oldest first and returns the later copies of each one: same
+    fingerprint, submitted within the idempotency window of the copy that is kept. Undated copies
+    predate the window and are duplicates of any earlier undated copy, however far apart.
+    """
+    kept = {}  # fingerprint -> submission time of the copy being kept (None when undated)
+    seen = ontology_subjects()  # seed individuals are re-created by every ontology sync
+    duplicates = []
+    offset = 0
+    while True:
+        bindings = fetch_submission_page(offset)
+        if bindings is None:
+            raise RuntimeError("Could not read submissions from Fuseki.")
+        for b in bindings:
+            row = {k: v['value'] for k, v in b.items()}
+            if row['applicant'] in seen: continue
+            seen.add(row['applicant'])
+            try:
+                fp = stored_submission_fingerprint(row)
+                submitted = None
+                if 'submitted' in row:
+                    submitted = datetime.fromisoformat(row['submitted'].replace('Z', '+00:00')).timestamp()
+            except ValueError:
+                continue  # malformed literal: leave the individual alone
+            # Undated rows sort first: an undated copy is always a repeat, a dated one only inside
+            # the window of a dated copy (its gap to an undated one is unknown)
+            first = kept.get(fp)
+            if fp in kept and (submitted is None or (first is not None and submitted - first <= idempotency.INDEX_TTL_SECONDS)):
+                duplicates.append({"applicant": row['applicant'], "loan": row['loan'], "g": row['g'], "submitted": row.get('submitted')})
+            else:
+                kept[fp] = submitted
+        if len(bindings) < DEDUP_PAGE_SIZE:
+            return duplicates
+        offset += DEDUP_PAGE_SIZE
+
+def delete_submissions(duplicates):
+    """Removes duplicate applicants and their loans, a batch of individuals per SPARQL request."""
+    removed = 0
+    for i in range(0, len(duplicates), DEDUP_DELETE_BATCH):
+        batch = duplicates[i:i + DEDUP_DELETE_BATCH]
+        statements = []
+        for d in batch:
+            for node in (d['applicant'], d['loan']):
+                statements.append(f"DELETE WHERE {{ {in_graph(d['g'], f'<{node}> ?p ?o')} }}")
+        if not update_fuseki(" ;\n".join(statements)):
+            break
+        removed += len(batch)
+    return removed
+
+@app.route("/dedup", methods=["POST"])
+def dedup():
+    """One-off cleanup of duplicates stored before /evaluate deduplicated. Dry run unless ?apply=1."""
+    try:
+        duplicates = find_duplicate_submissions()
+    except RuntimeError as e:
+        return jsonify({"error": str(e)}), 502
+    report = {"duplicates": len(duplicates), "applicants": [d['applicant'] for d in duplicates], "removed": 0}
+    if request.args.get("apply") == "1":
+        report["removed"] = delete_submissions(duplicates)
+    return jsonify(report)
+
+@app.route("/audit/decisions")
+def audit_decisions():
+    """Aggregate report over the local decision log (?since=/?until= ISO dates)."""
+    try:
+        since = datetime.fromisoformat(request.args['since']) if request.args.get('since') else None
+        until = decision_log.parse_until(request.args['until']) if request.args.get('until') else None
+    except ValueError:
+        return jsonify({"error": "since/until must be ISO dates, e.g. 2026-10-01."}), 400
+    decision_log.flush()
+    result = decision_log.report(since, until)
+    result["dropped_records"] = decision_log.DROPPED_RECORDS  # lost by this process while the log was unwritable
+    return jsonify(result)
+
 @app.route("/predict", methods=["POST"])
 def predict():
     data = request.json
@@ -727,53 +1548,23 @@ def predict():
         "hasJewelryCollateral": "Gold" in collateral,
         "hasFDCollateral": "FD" in collateral,
         "hasAge": age,
-        "hasLoanTenure": duration
+        "hasLoanTenure": duration,
+        "requestedLoanAmount": amount
     }
 
     # 2. Dynamic Recommendation Logic (Driven by Ontology)
-    best_loan = f"NSB {purpose} Loan"
-    score = 85
     justification = f"Based on your {employment} profile and need for {purpose} financing."
     
     # Check Rejection constraints specifically
-    rejections = []
     if not ONTOLOGY_CONSTRAINTS: load_ontology_constraints()
-    
-    for rej_class, rules in ONTOLOGY_CONSTRAINTS.items():
-        # Only check rejections relevant to this category if possible, or all for safety
-        if "Rejection" in rej_class or "Rejected" in rej_class:
-            matches = True
-            for rule in rules:
-                val = applicant_data.get(rule['prop'])
-                if val is None: continue
-                target = rule['val']
-                op = rule['type']
-                if op == 'hasValue' and val != target: matches = False
-                elif op == 'minInclusive' and val < target: matches = False
-                elif op == 'maxInclusive' and val > target: matches = False
-                elif op == 'minExclusive' and val <= target: matches = False
-                elif op == 'maxExclusive' and val >= target: matches = False
-                if not matches: break
-            if matches:
-                rejections.append(re.sub(r'([A-Z])', r' \1', rej_class).strip())
+    rejections = [advisor.readable_class(c) for c in advisor.matched_classes(applicant_data, ONTOLOGY_CONSTRAINTS, "rejection")]
 
     if rejections:
-        score = 40
         justification = f"WARNING: Our ontology identifies potential conflicts: {', '.join(rejections)}. Please ensure you meet all mandatory criteria."
 
     # Specific Recommendation
-    if "FD" in collateral:
-        best_loan = "NSB FD-Backed Loan"
-        score = 98
-    elif "Gold" in collateral and amount < 500000:
-        best_loan = "Pawning / Gold Loan"
-        score = 95
-    elif purpose == "Education" and has_al and age <= 25:
-        best_loan = "Interest Free Student Loan (IFSLS)"
-        score = 92
-    elif purpose == "Personal" and is_female:
-        best_loan = "Vanitha Aruna"
-        score = 90
+    profile = {"purpose": purpose, "collateral": collateral, "age": age, "has_al": has_al, "is_female": is_female}
+    best_loan, score = advisor.recommendation(amount=amount, rejected=bool(rejections), **profile)
 
     # 3. Document & Security Mapping (Static for now, but linked to Loan types)
     docs = ["NIC Copy", "Income Proof"]
@@ -786,14 +1577,25 @@ def predict():
         docs += ["Gold Items"]
         sec = ["Gold Collateral"]
 
-    return jsonify({
+    result = {
         "recommended_loan": best_loan,
         "description": f"Targeted {purpose} solution driven by ontology logic.",
         "documents": docs,
         "security": sec,
         "justification": justification,
         "score": score
-    })
+    }
+
+    # 4. Margin Analysis: boundaries, counterfactuals and the feasibility surface in one call
+    if data.get("analysis"):
+        try:
+            axes = advisor.grid_axes(data.get("grid"), salary, duration, amount)
+        except ValueError as e:
+            return jsonify({"error": str(e)}), 400
+        result["margins"] = advisor.margin_analysis(applicant_data, ONTOLOGY_CONSTRAINTS, salary, expenses)
+        result["surface"] = advisor.feasibility_surface(applicant_data, ONTOLOGY_CONSTRAINTS, expenses, axes, profile)
+
+    return jsonify(result)
 
 @app.route("/sparql")
 def sparql_terminal():
@@ -0,0 +1,352 @@
+import os
+import sys
+import json
+import zlib
+import atexit
+import struct
+import argparse
+import threading
+from array import array
+from collections import Counter
+from datetime import date, datetime, timezone
+
+# Decision Audit Log
+# Every /evaluate assessment is appended to local segment files as compressed, columnar
+# record batches: input features, every matched restriction, the rule generation and
+# timings. Reports load the segments into column arrays and never touch Fuseki.
+#
+# Segment layout: one file per process and rotation, under LOG_DIR/YYYY-MM/, holding
+#   batch := b"DLB1" | u32 header length | header (JSON) | zlib(column buffers)
+# The header lists rows, the batch's timestamp range and each column's type, byte size
+# and (for strings) dictionary. Column buffers are little-endian, in header order.
+LOG_DIR = os.path.join(os.path.dirname(__file__), "state", "decisions")
+BATCH_ROWS = 128          # records buffered before a batch is written
+FLUSH_SECONDS = 5         # ... or this long after the first buffered record
+MAX_PENDING_ROWS = 8 * BATCH_ROWS  # while writes fail, older records beyond this are dropped
+SEGMENT_MAX_BYTES = 8 << 20
+MAGIC = b"DLB1"
+
+# Column name -> type. i64/f64/bool map to array typecodes q/d/b (bool: 1, 0, -1 for unknown);
+# str is dictionary-encoded; list<str> adds per-row offsets into the dictionary indices.
+SCHEMA = [
+    ("ts", "i64"),  # epoch milliseconds
+    ("applicant_id", "str"),
+    ("loan_id", "str"),
+    ("generation", "str"),
+    ("diagnosis", "str"),
+    ("category", "str"),
+    ("matched", "list<str>"),  # every restriction class the applicant matched
+    ("eval_ms", "f64"),
+    ("store_ms", "f64"),
+    ("stored", "bool"),
+    ("employment", "str"),
+    ("loan_class", "str"),
+    ("hasAge", "i64"),
+    ("hasMonthlyIncome", "i64"),
+    ("hasDTI", "f64"),
+    ("hasCRIBScore", "i64"),
+    ("requestedLoanAmount", "i64"),
+    ("hasLoanTenure", "i64"),
+    ("isResident", "bool"),
+    ("isSriLankan", "bool"),
+    ("hasPreviousArrears", "bool"),
+    ("isPermanentRole", "bool"),
+    ("hasPensionProof", "bool"),
+    ("hasAL3Passes", "bool"),
+    ("isRecognizedInstitution", "bool"),
+    ("hasJewelryCollateral", "bool"),
+    ("hasClearTitle", "bool")
+]
+TYPECODES = {"i64": "q", "f64": "d", "bool": "b"}
+
+LOG_LOCK = threading.Lock()
+PENDING_RECORDS = []
+FLUSH_TIMER = None
+FLUSH_FAILED = False  # last write failed: retry on the timer, not on every append
+DROPPED_RECORDS = 0   # records this process discarded because the buffer was full
+ACTIVE_SEGMENT = None  # segment this process is appending to
+
+def little_endian(values):
+    if sys.byteorder == "big":
+        values = array(values.typecode, values)
+        values.byteswap()
+    return values
+
+def encode_value(kind, value):
+    if kind == "i64": return int(value) if value is not None else 0
+    if kind == "f64": return float(value) if value is not None else float("nan")
+    if value is None: return -1
+    return 1 if value is True or str(value).lower() == "true" else 0
+
+def encode_batch(records):
+    """Packs buffered records into one compressed record batch."""
+    columns, buffers = [], []
+    for name, kind in SCHEMA:
+        values = [r.get(name) for r in records]
+        column = {"name": name, "type": kind}
+        if kind in TYPECODES:
+            buf = little_endian(array(TYPECODES[kind], [encode_value(kind, v) for v in values])).tobytes()
+        else:
+            dictionary = {}
+            if kind == "str":
+                indices = array("i", [dictionary.setdefault(str(v), len(dictionary)) if v is not None else -1 for v in values])
+                buf = little_endian(indices).tobytes()
+            else:
+                offsets, indices = array("i", [0]), array("i")
+                for v in values:
+                    indices.extend(dictionary.setdefault(str(item), len(dictionary)) for item in (v or []))
+                    offsets.append(len(indices))
+                buf = little_endian(offsets).tobytes() + little_endian(indices).tobytes()
+            column["dictionary"] = list(dictionary)
+        column["size"] = len(buf)
+        columns.append(column)
+        buffers.append(buf)
+
+    body = zlib.compress(b"".join(buffers))
+    timestamps = [encode_value("i64", r.get("ts")) for r in records]
+    header = json.dumps({
+        "rows": len(records),
+        "ts_min": min(timestamps),
+        "ts_max": max(timestamps),
+        "body_length": len(body),
+        "columns": columns
+    }, separators=(",", ":")).encode()
+    return MAGIC + struct.pack("<I", len(header)) + header + body
+
+def month_of(ts_ms):
+    return datetime.fromtimestamp(ts_ms / 1000, timezone.utc).strftime("%Y-%m")
+
+def segment_for(batch_size, month):
+    """The segment to append to, rotating on month change or when the size cap is reached."""
+    global ACTIVE_SEGMENT
+    if ACTIVE_SEGMENT is not None:
+        same_month = os.path.basename(os.path.dirname(ACTIVE_SEGMENT)) == month
+        size = os.path.getsize(ACTIVE_SEGMENT) if os.path.exists(ACTIVE_SEGMENT) else 0
+        if same_month and size + batch_size <= SEGMENT_MAX_BYTES:
+            return ACTIVE_SEGMENT
+
+    directory = os.path.join(LOG_DIR, month)
+    os.makedirs(directory, exist_ok=True)
+    opened = datetime.now(timezone.utc).strftime("%Y%m%dT%H%M%S%f")
+    ACTIVE_SEGMENT = os.path.join(directory, f"{opened}-{os.getpid()}.dlog")
+    return ACTIVE_SEGMENT
+
+def flush_pending():
+    """Writes buffered records as one batch. Callers hold LOG_LOCK."""
+    global FLUSH_TIMER, FLUSH_FAILED, ACTIVE_SEGMENT
+    if FLUSH_TIMER is not None:
+        FLUSH_TIMER.cancel()
+        FLUSH_TIMER = None
+    if not PENDING_RECORDS:
+        return
+    # One batch per month, so each lands in the directory list_segments looks in for its timestamps
+    by_month = {}
+    for record in PENDING_RECORDS:
+        by_month.setdefault(month_of(encode_value("i64", record.get("ts"))), []).append(record)
+    try:
+        for month, records in list(by_month.items()):
+            batch = encode_batch(records)
+            path = segment_for(len(batch), month)
+            # One write per batch; a crash mid-write leaves a short tail that readers skip
+            with open(path, "ab") as f:
+                f.write(batch)
+                f.flush()
+                os.fsync(f.fileno())
+            del by_month[month]
+        PENDING_RECORDS.clear()
+        FLUSH_FAILED = False
+    except Exception as e:
+        PENDING_RECORDS[:] = [record for records in by_month.values() for record in records]
+        # Records stay buffered; the next attempt waits for the timer and opens a new segment,
+        # since readers stop at a torn batch and would never see anything appended after it
+        ACTIVE_SEGMENT = None
+        print(f"Decision Log Error: {e} ({len(PENDING_RECORDS)} buffered, {DROPPED_RECORDS} dropped)")
+        FLUSH_FAILED = True
+        FLUSH_TIMER = threading.Timer(FLUSH_SECONDS, flush)
+        FLUSH_TIMER.daemon = True
+        FLUSH_TIMER.start()
+
+def flush():
+    with LOG_LOCK:
+        flush_pending()
+
+def append(record):
+    """Buffers one evaluation; written once the batch fills or FLUSH_SECONDS pass."""
+    global FLUSH_TIMER, DROPPED_RECORDS
+    with LOG_LOCK:
+        PENDING_RECORDS.append(record)
+        if len(PENDING_RECORDS) > MAX_PENDING_ROWS:
+            overflow = len(PENDING_RECORDS) - MAX_PENDING_ROWS
+            del PENDING_RECORDS[:overflow]
+            DROPPED_RECORDS += overflow
+        if len(PENDING_RECORDS) >= BATCH_ROWS and not FLUSH_FAILED:
+            flush_pending()
+        elif FLUSH_TIMER is None:
+            FLUSH_TIMER = threading.Timer(FLUSH_SECONDS, flush)
+            FLUSH_TIMER.daemon = True
+            FLUSH_TIMER.start()
+
+atexit.register(flush)
+
+def parse_until(text):
+    """ISO date/time for an inclusive upper bound; a bare date means the end of that day."""
+    try:
+        day = date.fromisoformat(text)
+    except ValueError:
+        return datetime.fromisoformat(text)
+    return datetime.combine(day, datetime.max.time())
+
+def to_epoch_ms(moment):
+    if moment is None: return None
+    if isinstance(moment, (int, float)): return int(moment)
+    if moment.tzinfo is None: moment = moment.replace(tzinfo=timezone.utc)
+    return int(moment.timestamp() * 1000)
+
+def list_segments(since=None, until=None):
+    """Segment paths in write order, skipping month directories outside [since, until]."""
+    if not os.path.isdir(LOG_DIR):
+        return []
+    first = month_of(since) if since is not None else None
+    last = month_of(until) if until is not None else None
+    paths = []
+    for month in sorted(os.listdir(LOG_DIR)):
+        if (first and month < first) or (last and month > last): continue
+        directory = os.path.join(LOG_DIR, month)
+        paths.extend(os.path.join(directory, f) for f in sorted(os.listdir(directory)) if f.endswith(".dlog"))
+    return paths
+
+def iter_batches(path):
+    """Yields (header, compressed body) for each complete batch in a segment."""
+    with open(path, "rb") as f:
+        while True:
+            prefix = f.read(8)
+            if len(prefix) < 8 or prefix[:4] != MAGIC:
+                return
+            header_bytes = f.read(struct.unpack("<I", prefix[4:])[0])
+            try:
+                header = json.loads(header_bytes)
+            except ValueError:
+                return  # torn write
+            body = f.read(header["body_length"])
+            if len(body) < header["body_length"]:
+                return
+            yield header, body
+
+def decode_column(column, buf, rows):
+    kind = column["type"]
+    if kind in TYPECODES:
+        values = array(TYPECODES[kind])
+        values.frombytes(buf)
+        return little_endian(values)
+
+    dictionary = column["dictionary"]
+    if kind == "str":
+        indices = array("i")
+        indices.frombytes(buf)
+        return [dictionary[i] if i >= 0 else None for i in little_endian(indices)]
+
+    offsets, indices = array("i"), array("i")
+    offsets.frombytes(buf[:(rows + 1) * offsets.itemsize])
+    indices.frombytes(buf[(rows + 1) * offsets.itemsize:])
+    offsets, indices = little_endian(offsets), little_endian(indices)
+    return [tuple(dictionary[i] for i in indices[offsets[n]:offsets[n + 1]]) for n in range(rows)]
+
+def empty_column(kind, rows):
+    """Fill for a column that older batches predate."""
+    if kind in TYPECODES:
+        return array(TYPECODES[kind], [encode_value(kind, None)] * rows)
+    return [None if kind == "str" else ()] * rows
+
+def load_columns(since=None, until=None, columns=None):
+    """
+    Loads logged evaluations in [since, until] (datetimes or epoch ms) as column arrays:
+    array('q'/'d'/'b') for numbers and flags, lists for strings and matched restrictions.
+    Batches whose timestamp range misses the window are skipped without decompressing.
+    """
+    since, until = to_epoch_ms(since), to_epoch_ms(until)
+    kinds = dict(SCHEMA)
+    wanted = [c for c in (columns or kinds) if c in kinds]
+    result = {name: empty_column(kinds[name], 0) for name in wanted}
+
+    for path in list_segments(since, until):
+        for header, body in iter_batches(path):
+            if since is not None and header["ts_max"] < since: continue
+            if until is not None and header["ts_min"] > until: continue
+
+            rows = header["rows"]
+            raw = zlib.decompress(body)
+            decoded, offset = {}, 0
+            for column in header["columns"]:
+                if column["name"] in wanted or column["name"] == "ts":
+                    decoded[column["name"]] = decode_column(column, raw[offset:offset + column["size"]], rows)
+                offset += column["size"]
+
+            keep = None
+            if (since is not None and header["ts_min"] < since) or (until is not None and header["ts_max"] > until):
+                keep = [n for n, ts in enumerate(decoded["ts"])
+                        if (since is None or ts >= since) and (until is None or ts <= until)]
+
+            for name in wanted:
+                values = decoded.get(name)
+                if values is None:
+                    values = empty_column(kinds[name], rows)
+                if keep is not None:
+                    values = type(values)(values.typecode, (values[n] for n in keep)) if isinstance(values, array) else [values[n] for n in keep]
+                result[name].extend(values)
+    return result
+
+def percentile(sorted_values, q):
+    if not sorted_values: return None
+    return round(sorted_values[min(len(sorted_values) - 1, int(q * len(sorted_values)))], 3)
+
+def summarize(cols):
+    """Aggregate compliance report over loaded columns."""
+    diagnoses = cols["diagnosis"]
+    total = len(diagnoses)
+
+    by_loan_class = {}
+    for loan_class, diagnosis in zip(cols["loan_class"], diagnoses):
+        entry = by_loan_class.setdefault(loan_class or "Unknown", Counter())
+        entry[diagnosis] += 1
+
+    by_generation = {}
+    for generation, diagnosis in zip(cols["generation"], diagnoses):
+        entry = by_generation.setdefault(generation or "unknown", Counter())
+        entry[diagnosis] += 1
+
+    matched = Counter(restriction for row in cols["matched"] for restriction in row)
+    multiple = sum(1 for row in cols["matched"] if len(row) > 1)
+    eval_ms = sorted(cols["eval_ms"])
+    store_ms = sorted(cols["store_ms"])
+
+    return {
+        "evaluations": total,
+        "diagnosis": dict(Counter(diagnoses)),
+        "categories": dict(Counter(cols["category"]).most_common()),
+        "matched_restrictions": dict(matched.most_common()),
+        "multiple_matches": multiple,
+        "by_loan_class": {k: dict(v) for k, v in sorted(by_loan_class.items())},
+        "by_generation": {k: dict(v) for k, v in by_generation.items()},
+        "store_failures": sum(1 for s in cols["stored"] if s == 0),
+        "latency_ms": {
+            "eval_p50": percentile(eval_ms, 0.5),
+            "eval_p95": percentile(eval_ms, 0.95),
+            "store_p50": percentile(store_ms, 0.5),
+            "store_p95": percentile(store_ms, 0.95)
+        }
+    }
+
+REPORT_COLUMNS = ["ts", "diagnosis", "category", "matched", "loan_class", "generation", "eval_ms", "store_ms", "stored"]
+
+def report(since=None, until=None):
+    return summarize(load_columns(since, until, REPORT_COLUMNS))
+
+def main():
+    parser = argparse.ArgumentParser(description="Aggregate report over the local decision audit log.")
+    parser.add_argument("--since", type=datetime.fromisoformat, help="ISO date/time, UTC unless offset given")
+    parser.add_argument("--until", type=parse_until, help="inclusive; a bare date covers that whole day")
+    args = parser.parse_args()
+    print(json.dumps(report(args.since, args.until), indent=2))
+
+if __name__ == "__main__":
+    main()
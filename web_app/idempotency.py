@@ -0,0 +1,123 @@
+import os
+import json
+import time
+import sqlite3
+import hashlib
+from contextlib import closing
+
+# Submission Deduplication Index
+# Maps Idempotency-Key headers and payload fingerprints to the result /evaluate already
+# issued, so retries and resubmissions are replayed instead of minting new individuals.
+INDEX_PATH = os.path.join(os.path.dirname(__file__), "state", "idempotency.sqlite3")
+INDEX_MAX_ENTRIES = 50000
+INDEX_TTL_SECONDS = 24 * 3600  # identical submissions after this window count as new applications
+
+# Concurrent duplicates (double-clicks, retries landing on another worker process) are
+# arbitrated by the index itself: the first request claims the keys, the others wait for its result
+CLAIM_WAIT_SECONDS = 30     # how long a duplicate waits for the claiming request to finish
+CLAIM_POLL_SECONDS = 0.1
+CLAIM_STALE_SECONDS = 120   # a claim this old belongs to a request that died
+PENDING = "null"            # result column of a claimed, not yet answered submission
+
+def connect(path=None):
+    path = path or INDEX_PATH
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    conn = sqlite3.connect(path, timeout=10)
+    conn.execute("""
+        CREATE TABLE IF NOT EXISTS submissions (
+            key TEXT PRIMARY KEY,
+            fingerprint TEXT NOT NULL,
+            result TEXT NOT NULL,
+            created REAL NOT NULL
+        )
+    """)
+    conn.execute("CREATE INDEX IF NOT EXISTS submissions_created ON submissions (created)")
+    return conn
+
+def normalize_name(name):
+    return " ".join(str(name).split()).lower()
+
+def fingerprint(fields):
+    """Stable hash of a normalized submission (see submission_fields in app.py)."""
+    canonical = json.dumps(fields, sort_keys=True, separators=(",", ":"))
+    return hashlib.sha256(canonical.encode()).hexdigest()
+
+def submission_keys(submission_fingerprint, idempotency_key=None):
+    return [f"hash:{submission_fingerprint}"] + ([f"idem:{idempotency_key}"] if idempotency_key else [])
+
+def entry(conn, key, now=None):
+    """{'fingerprint', 'result'} for a live entry (result None while claimed), or None."""
+    now = now or time.time()
+    row = conn.execute("SELECT fingerprint, result, created FROM submissions WHERE key = ?", (key,)).fetchone()
+    if not row or now - row[2] > INDEX_TTL_SECONDS:
+        return None
+    if row[1] == PENDING and now - row[2] > CLAIM_STALE_SECONDS:
+        return None
+    return {"fingerprint": row[0], "result": json.loads(row[1])}
+
+def lookup(key):
+    """Returns {'fingerprint', 'result'} for a live entry, or None."""
+    with closing(connect()) as conn:
+        return entry(conn, key)
+
+def try_claim(submission_fingerprint, idempotency_key=None):
+    """
+    One look at the index inside a write transaction, so the check and the claim are atomic
+    across threads and processes. Returns (status, result) with status one of
+    'conflict', 'replay', 'pending' or 'claimed'.
+    """
+    now = time.time()
+    hash_key, *idem = submission_keys(submission_fingerprint, idempotency_key)
+    with closing(connect()) as conn, conn:
+        conn.execute("BEGIN IMMEDIATE")
+        by_key = entry(conn, idem[0], now) if idem else None
+        if by_key and by_key['fingerprint'] != submission_fingerprint:
+            return "conflict", None
+        cached = by_key or entry(conn, hash_key, now)
+        if cached and cached['result'] is None:
+            return "pending", None
+        if cached:
+            if idem and not by_key:
+                # Bind the new key too, so a later reuse with a different payload is still caught
+                conn.execute(
+                    "INSERT OR REPLACE INTO submissions (key, fingerprint, result, created) VALUES (?, ?, ?, ?)",
+                    (idem[0], submission_fingerprint, json.dumps(cached['result']), now)
+                )
+            return "replay", cached['result']
+        conn.executemany(
+            "INSERT OR REPLACE INTO submissions (key, fingerprint, result, created) VALUES (?, ?, ?, ?)",
+            [(key, submission_fingerprint, PENDING, now) for key in [hash_key] + idem]
+        )
+        return "claimed", None
+
+def claim(submission_fingerprint, idempotency_key=None, wait=CLAIM_WAIT_SECONDS):
+    """Claims a submission for assessment, waiting up to `wait` seconds while another request holds it."""
+    deadline = time.monotonic() + wait
+    while True:
+        status, result = try_claim(submission_fingerprint, idempotency_key)
+        if status != "pending" or time.monotonic() >= deadline:
+            return status, result
+        time.sleep(CLAIM_POLL_SECONDS)
+
+def release(keys, submission_fingerprint):
+    """Drops this request's unanswered claims so the submission can be retried."""
+    with closing(connect()) as conn, conn:
+        conn.executemany(
+            "DELETE FROM submissions WHERE key = ? AND fingerprint = ? AND result = ?",
+            [(key, submission_fingerprint, PENDING) for key in keys]
+        )
+
+def remember(keys, submission_fingerprint, result):
+    """Records the issued result under every key, then trims expired and overflow entries."""
+    now = time.time()
+    payload = json.dumps(result)
+    with closing(connect()) as conn, conn:
+        conn.executemany(
+            "INSERT OR REPLACE INTO submissions (key, fingerprint, result, created) VALUES (?, ?, ?, ?)",
+            [(key, submission_fingerprint, payload, now) for key in keys]
+        )
+        conn.execute("DELETE FROM submissions WHERE created < ?", (now - INDEX_TTL_SECONDS,))
+        conn.execute(
+            "DELETE FROM submissions WHERE key IN (SELECT key FROM submissions ORDER BY created DESC LIMIT -1 OFFSET ?)",
+            (INDEX_MAX_ENTRIES,)
+        )
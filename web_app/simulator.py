@@ -0,0 +1,291 @@
+import os
+import csv
+import math
+import json
+import time
+import argparse
+import tempfile
+import requests
+from collections import Counter
+from concurrent.futures import ProcessPoolExecutor
+
+# Policy What-If Simulator
+# Re-evaluates the stored portfolio under a candidate rule set. Fuseki is hit once for a
+# CSV snapshot; everything after that runs locally across a process pool.
+SNAPSHOT_PATH = os.path.join(os.path.dirname(__file__), "state", "portfolio.csv")
+CHUNKS_PER_WORKER = 4  # smaller chunks even out skew between workers
+
+NUMERIC_OPS = {'minInclusive', 'maxInclusive', 'minExclusive', 'maxExclusive'}
+# perform_logical_assessment only honours these facets on approval classes
+APPROVAL_OPS = {'hasValue', 'minInclusive', 'maxInclusive'}
+# The applicant properties assessment_input hands to perform_logical_assessment. Rules on
+# anything else (loan-level hasLoanTenure, requestedLoanAmount, ...) never match on the live path.
+ASSESSED_PROPERTIES = {
+    'hasAge', 'hasMonthlyIncome', 'hasCRIBScore', 'hasDTI', 'isResident', 'isSriLankan',
+    'isPermanentRole', 'hasPreviousArrears', 'isRecognizedInstitution', 'hasJewelryCollateral'
+}
+
+def validate_constraints(constraints):
+    """Checks a constraint set has the {class: [{'prop', 'type', 'val'}, ...]} shape of ONTOLOGY_CONSTRAINTS."""
+    if not isinstance(constraints, dict) or not constraints:
+        raise ValueError("Constraint set must be a non-empty object keyed by class name.")
+    for cls_name, rules in constraints.items():
+        if not isinstance(rules, list):
+            raise ValueError(f"Rules for '{cls_name}' must be a list.")
+        for rule in rules:
+            if not isinstance(rule, dict) or not {'prop', 'type', 'val'} <= set(rule):
+                raise ValueError(f"Each rule for '{cls_name}' needs 'prop', 'type' and 'val'.")
+            if not isinstance(rule['val'], (bool, int, float, str)):
+                raise ValueError(f"Rule values for '{cls_name}' must be scalars.")
+            if isinstance(rule['val'], float) and not math.isfinite(rule['val']):
+                raise ValueError(f"Rule values for '{cls_name}' must be finite numbers.")
+            if rule['type'] in NUMERIC_OPS:
+                try:
+                    finite = math.isfinite(float(rule['val']))
+                except ValueError:
+                    finite = False
+                if not finite:
+                    raise ValueError(f"'{rule['type']}' on '{cls_name}' needs a finite numeric value.")
+    return constraints
+
+def rule_properties(*constraint_sets):
+    return {rule['prop'] for constraints in constraint_sets for rules in constraints.values() for rule in rules}
+
+def referenced_properties(*constraint_sets):
+    """Rule properties the live assessment actually sees; only these are exported."""
+    return sorted(rule_properties(*constraint_sets) & ASSESSED_PROPERTIES)
+
+def portfolio_export_query(props):
+    """One row per applicant: loan type plus the applicant's own value for each assessed property."""
+    columns = " ".join(f"(SAMPLE(?v_{p}) AS ?{p})" for p in props)
+    optionals = "\n      ".join(f"OPTIONAL {{ ?applicant loan:{p} ?v_{p} }}" for p in props)
+    return f"""
+    PREFIX rdf: <http://www.w3.org/1999/02/22-rdf-syntax-ns#>
+    PREFIX rdfs: <http://www.w3.org/2000/01/rdf-schema#>
+    PREFIX loan: <http://www.semanticweb.org/ontology/loan_approval#>
+    SELECT ?applicant (SAMPLE(?lt) AS ?loanType) {columns}
+    FROM <urn:x-arq:DefaultGraph>
+    FROM <urn:x-arq:UnionGraph>
+    WHERE {{
+      {{ SELECT DISTINCT ?applicant WHERE {{ ?applicant rdf:type/rdfs:subClassOf* loan:Applicant }} }}
+      OPTIONAL {{
+        ?applicant loan:appliesFor ?loan .
+        ?loan rdf:type ?lt .
+        ?lt rdfs:subClassOf* loan:Loan .
+        FILTER(?lt != loan:Loan)
+      }}
+      {optionals}
+    }}
+    GROUP BY ?applicant
+    """
+
+def export_portfolio(query_url, props, path=SNAPSHOT_PATH):
+    """Streams the portfolio snapshot from Fuseki straight to a local CSV file."""
+    response = requests.post(
+        query_url,
+        data={'query': portfolio_export_query(props)},
+        headers={'Accept': 'text/csv'},
+        stream=True
+    )
+    response.raise_for_status()
+
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    # A temp file per export: concurrent /simulate requests must not write into the same one
+    fd, tmp_path = tempfile.mkstemp(dir=os.path.dirname(path), prefix=os.path.basename(path) + ".", suffix=".part")
+    try:
+        with os.fdopen(fd, 'wb') as f:
+            for chunk in response.iter_content(chunk_size=1 << 20):
+                f.write(chunk)
+        os.replace(tmp_path, path)
+    except BaseException:
+        os.unlink(tmp_path)
+        raise
+    return path
+
+def num(raw):
+    try:
+        return float(raw)
+    except ValueError:
+        return None  # empty or malformed: the rule fails, as in perform_logical_assessment
+
+def numeric_properties(*constraint_sets):
+    """Properties compared numerically by any rule; everything else is matched on the raw cell."""
+    return {
+        rule['prop']
+        for constraints in constraint_sets for rules in constraints.values() for rule in rules
+        if rule['type'] in NUMERIC_OPS or type(rule['val']) in (int, float)
+    }
+
+def compile_classifier(constraint_sets, columns):
+    """
+    Generates classify(cells) -> (outcome per constraint set) over raw snapshot cells.
+    Class selection, facet handling and inputs mirror perform_logical_assessment over
+    assessment_input: a rule on a property outside ASSESSED_PROPERTIES never holds, even if an
+    older snapshot has a column for it. Numeric columns are decoded once per row and shared by
+    every set; rule values are embedded with repr(), and validate_constraints only admits scalars.
+    """
+    index = {col: i for i, col in enumerate(columns) if col in ASSESSED_PROPERTIES}
+    numeric = sorted(p for p in numeric_properties(*constraint_sets) if p in index)
+    comparisons = {'minInclusive': '>=', 'maxInclusive': '<=', 'minExclusive': '>', 'maxExclusive': '<'}
+
+    def term(rule):
+        op, prop, val = rule['type'], rule['prop'], rule['val']
+        if prop not in index: return "False"
+        if prop in numeric:
+            cell = f"n_{prop}"
+            if op == 'hasValue': return f"{cell} == {val!r}"
+            return f"({cell} is not None and {cell} {comparisons[op]} {float(val)!r})"
+        # hasValue on a non-numeric property: compare the literal's lexical form
+        literal = str(val).lower() if isinstance(val, bool) else str(val)
+        return f"r[{index[prop]}] == {literal!r}"
+
+    def condition(rules, allowed_ops):
+        terms = [term(rule) for rule in rules if rule['type'] in allowed_ops]  # unknown facets never block a match
+        return " and ".join(terms) or "True"
+
+    all_ops = {'hasValue'} | NUMERIC_OPS
+    body = [f"    n_{p} = num(r[{index[p]}])" for p in numeric]
+    for n, constraints in enumerate(constraint_sets):
+        branches = []
+        for cls_name, rules in constraints.items():
+            if "Rejection" not in cls_name and "Applicant" not in cls_name: continue
+            if "Approved" in cls_name: continue
+            branches.append((condition(rules, all_ops), "Rejected"))
+        for cls_name, rules in constraints.items():
+            if "Approved" not in cls_name: continue
+            branches.append((condition(rules, APPROVAL_OPS), "Approved"))
+        for i, (cond, outcome) in enumerate(branches):
+            body.append(f"    {'if' if i == 0 else 'elif'} {cond}: o{n} = {outcome!r}")
+        body.append(f"    {'else:' if branches else 'if True:'} o{n} = 'Pending'")
+    body.append(f"    return ({', '.join(f'o{n}' for n in range(len(constraint_sets)))},)")
+
+    namespace = {'num': num}
+    exec("def classify(r):\n" + "\n".join(body), namespace)
+    return namespace['classify']
+
+def simulate_chunk(job):
+    """Worker: re-evaluates the snapshot rows that start inside [start, end)."""
+    path, start, end, baseline, candidate = job
+    counts = Counter()
+
+    with open(path, 'rb') as f:
+        header = next(csv.reader([f.readline().decode('utf-8')]))
+        loan_col = header.index('loanType')
+        classify = compile_classifier([baseline, candidate], header)
+
+        # Align to the first full line at or after start; the previous chunk owns the partial one
+        if start > f.tell():
+            f.seek(start - 1)
+            f.readline()
+        begin = f.tell()
+        block = f.read(max(0, end - begin))
+        if block and not block.endswith(b"\n"):
+            block += f.readline()  # finish the last row; a row starting at end belongs to the next chunk
+
+    for cells in csv.reader(block.decode('utf-8').splitlines()):
+        if not cells: continue
+        before, after = classify(cells)
+        counts[(cells[loan_col].split("#")[-1] or "General", before, after)] += 1
+    return counts
+
+def chunk_ranges(path, n_chunks):
+    """Splits the snapshot body into byte ranges of roughly equal size."""
+    size = os.path.getsize(path)
+    with open(path, 'rb') as f:
+        f.readline()
+        body_start = f.tell()
+    step = max(1, -(-(size - body_start) // max(1, n_chunks)))
+    return [(s, min(s + step, size)) for s in range(body_start, size, step)]
+
+def simulate_snapshot(path, baseline, candidate, workers=None):
+    """Fans the snapshot out across a process pool and merges the outcome counts."""
+    workers = workers or os.cpu_count() or 1
+    ranges = chunk_ranges(path, workers * CHUNKS_PER_WORKER)
+    jobs = [(path, start, end, baseline, candidate) for start, end in ranges]
+
+    totals = Counter()
+    if not jobs:
+        return totals
+    with ProcessPoolExecutor(max_workers=min(workers, len(jobs))) as pool:
+        for counts in pool.map(simulate_chunk, jobs):
+            totals.update(counts)
+    return totals
+
+def summarize(counts):
+    """Turns (loan type, before, after) counts into the transition report."""
+    by_loan_type = {}
+    totals = Counter()
+    applicants = changed = 0
+    for (loan_type, before, after), n in sorted(counts.items()):
+        entry = by_loan_type.setdefault(loan_type, {"applicants": 0, "before": Counter(), "after": Counter(), "transitions": {}})
+        entry["applicants"] += n
+        entry["before"][before] += n
+        entry["after"][after] += n
+        applicants += n
+        if before != after:
+            key = f"{before}->{after}"
+            entry["transitions"][key] = entry["transitions"].get(key, 0) + n
+            totals[key] += n
+            changed += n
+
+    for entry in by_loan_type.values():
+        entry["before"] = dict(entry["before"])
+        entry["after"] = dict(entry["after"])
+    return {"applicants": applicants, "changed": changed, "transitions": dict(totals), "by_loan_type": by_loan_type}
+
+def snapshot_covers(path, props):
+    """True if a snapshot exists and has a column for every property the rule sets need."""
+    if not os.path.exists(path):
+        return False
+    with open(path, newline='', encoding='utf-8') as f:
+        header = next(csv.reader(f), [])
+    return {'loanType', *props} <= set(header)
+
+def run_simulation(baseline, candidate, query_url, snapshot_path=SNAPSHOT_PATH, reuse_snapshot=False, workers=None):
+    """Exports the portfolio once (unless reusing a snapshot) and diffs outcomes between two rule sets."""
+    validate_constraints(baseline)
+    validate_constraints(candidate)
+
+    props = referenced_properties(baseline, candidate)
+    started = time.perf_counter()
+    if not (reuse_snapshot and snapshot_covers(snapshot_path, props)):
+        export_portfolio(query_url, props, snapshot_path)
+    exported = time.perf_counter()
+
+    report = summarize(simulate_snapshot(snapshot_path, baseline, candidate, workers))
+    report["unevaluated_properties"] = sorted(rule_properties(baseline, candidate) - ASSESSED_PROPERTIES)
+    report["export_seconds"] = round(exported - started, 3)
+    report["simulation_seconds"] = round(time.perf_counter() - exported, 3)
+    return report
+
+def main():
+    parser = argparse.ArgumentParser(description="Re-evaluate the stored portfolio under a candidate rule set.")
+    source = parser.add_mutually_exclusive_group(required=True)
+    source.add_argument("--constraints", help="JSON file holding an edited copy of ONTOLOGY_CONSTRAINTS")
+    source.add_argument("--owl", help="candidate OWL (RDF/XML) file")
+    parser.add_argument("--baseline", help="JSON constraint set to compare against (default: live rules from Fuseki)")
+    parser.add_argument("--snapshot", default=SNAPSHOT_PATH, help="portfolio snapshot CSV path")
+    parser.add_argument("--reuse-snapshot", action="store_true", help="skip the Fuseki export if the snapshot exists")
+    parser.add_argument("--workers", type=int, default=None)
+    args = parser.parse_args()
+
+    # Imported lazily: the app module connects to Fuseki on import to load the live rules
+    import app
+
+    if args.constraints:
+        with open(args.constraints) as f:
+            candidate = json.load(f)
+    else:
+        candidate = app.load_constraints_from_owl(args.owl)
+
+    if args.baseline:
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+    else:
+        baseline = app.load_ontology_constraints()
+
+    report = run_simulation(baseline, candidate, app.FUSEKI_QUERY_URL, args.snapshot, args.reuse_snapshot, args.workers)
+    print(json.dumps(report, indent=2))
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,202 @@
+import os
+import sys
+import json
+import time
+import shutil
+import argparse
+import resource
+import tempfile
+import threading
+import subprocess
+from collections import Counter
+from http.server import ThreadingHTTPServer, BaseHTTPRequestHandler
+
+import requests
+import sparql_results
+
+# Result Reader Benchmark
+# Serves a synthetic dashboard-shaped result set from a local endpoint and aggregates it
+# with the old response.json() path and with each streaming format. Every reader runs in
+# its own process so peak RSS is measured in isolation.
+LOAN = "http://www.semanticweb.org/ontology/loan_approval#"
+XSD = "http://www.w3.org/2001/XMLSchema#"
+VARIABLES = ["applicant", "label", "type", "loanType", "age", "income", "crib", "dti",
+             "residency", "citizenship", "permanent", "arrears", "decision"]
+TYPES_PER_APPLICANT = 2  # Applicant plus employment class, as the dashboard query returns them
+MODES = ["before", "json", "tsv", "csv"]
+
+def synthetic_applicant(i):
+    return {
+        "applicant": ("uri", f"{LOAN}App_{i:08x}"),
+        "label": ("literal", f"Applicant {i}", None),
+        "loanType": ("uri", f"{LOAN}{['HousingLoan', 'PersonalLoan', 'EducationLoan'][i % 3]}"),
+        "age": ("literal", str(18 + i % 50), f"{XSD}integer"),
+        "income": ("literal", str(40000 + (i * 7919) % 400000), f"{XSD}integer"),
+        "crib": ("literal", str(300 + (i * 31) % 600), f"{XSD}integer"),
+        "dti": ("literal", f"{(i % 70) / 100:.2f}", f"{XSD}decimal"),
+        "residency": ("literal", "true" if i % 9 else "false", f"{XSD}boolean"),
+        "citizenship": ("literal", "true", f"{XSD}boolean"),
+        "permanent": ("literal", "true" if i % 4 else "false", f"{XSD}boolean"),
+        "arrears": ("literal", "false" if i % 11 else "true", f"{XSD}boolean"),
+        "decision": ("literal", ["Approved", "Rejected", "Pending"][i % 3], None)
+    }
+
+def synthetic_rows(applicants):
+    for i in range(applicants):
+        base = synthetic_applicant(i)
+        for t in ["Applicant", ["SalariedEmployee", "SelfEmployed", "Retiree"][i % 3]][:TYPES_PER_APPLICANT]:
+            row = dict(base)
+            row["type"] = ("uri", f"{LOAN}{t}")
+            yield row
+
+def json_term(term):
+    if term[0] == "uri": return {"type": "uri", "value": term[1]}
+    out = {"type": "literal", "value": term[1]}
+    if term[2]: out["datatype"] = term[2]
+    return out
+
+def tsv_term(term):
+    if term[0] == "uri": return f"<{term[1]}>"
+    literal = '"' + term[1].replace("\\", "\\\\").replace('"', '\\"') + '"'
+    return f"{literal}^^<{term[2]}>" if term[2] else literal
+
+def csv_term(term):
+    value = term[1]
+    return f'"{value}"' if any(c in value for c in ',"\n') else value
+
+def write_payloads(directory, applicants):
+    """Writes the same result set as SPARQL JSON, TSV and CSV."""
+    paths = {fmt: os.path.join(directory, f"results.{fmt}") for fmt in ("json", "tsv", "csv")}
+    with open(paths["json"], "w") as fj, open(paths["tsv"], "w") as ft, open(paths["csv"], "w") as fc:
+        fj.write('{"head": {"vars": ' + json.dumps(VARIABLES) + '}, "results": {"bindings": [\n')
+        ft.write("\t".join(f"?{v}" for v in VARIABLES) + "\n")
+        fc.write(",".join(VARIABLES) + "\r\n")
+        for n, row in enumerate(synthetic_rows(applicants)):
+            fj.write(("," if n else "") + json.dumps({v: json_term(row[v]) for v in VARIABLES}) + "\n")
+            ft.write("\t".join(tsv_term(row[v]) for v in VARIABLES) + "\n")
+            fc.write(",".join(csv_term(row[v]) for v in VARIABLES) + "\r\n")
+        fj.write("]}}\n")
+    return paths
+
+def serve(paths):
+    """Local stand-in for the Fuseki query endpoint, answering by Accept header."""
+    by_type = {sparql_results.FORMATS[fmt]: (path, sparql_results.FORMATS[fmt]) for fmt, path in paths.items()}
+
+    class Handler(BaseHTTPRequestHandler):
+        def do_POST(self):
+            self.rfile.read(int(self.headers.get("Content-Length", 0)))
+            path, content_type = by_type[self.headers.get("Accept")]
+            self.send_response(200)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(os.path.getsize(path)))
+            self.end_headers()
+            with open(path, "rb") as f:
+                shutil.copyfileobj(f, self.wfile)
+
+        def log_message(self, *args):
+            pass
+
+    server = ThreadingHTTPServer(("127.0.0.1", 0), Handler)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server
+
+def rss_mib():
+    """Current resident set size."""
+    try:
+        with open("/proc/self/statm") as f:
+            return int(f.read().split()[1]) * os.sysconf("SC_PAGE_SIZE") / 2**20
+    except OSError:
+        return peak_rss_mib()
+
+def peak_rss_mib():
+    peak = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return peak / 2**20 if sys.platform == "darwin" else peak / 2**10
+
+def tally(applicants, counts):
+    for info in applicants:
+        counts["applicants"] += 1
+        counts[info["decision"]] += 1
+
+def aggregate_before(url):
+    """The previous dashboard path: whole JSON document, then an applicant map over every binding."""
+    response = requests.post(url, data={"query": "SELECT"}, headers={"Accept": sparql_results.FORMATS["json"]})
+    response.raise_for_status()
+    data = response.json()
+    applicant_map = {}
+    for b in data.get("results", {}).get("bindings", []):
+        uri = b["applicant"]["value"]
+        if uri not in applicant_map:
+            applicant_map[uri] = {
+                "name": b.get("label", {}).get("value"),
+                "types": set(),
+                "age": b.get("age", {}).get("value"),
+                "income": b.get("income", {}).get("value"),
+                "decision": b.get("decision", {}).get("value")
+            }
+        applicant_map[uri]["types"].add(b["type"]["value"])
+    counts = Counter()
+    tally(applicant_map.values(), counts)
+    return counts
+
+def aggregate_streamed(url, fmt):
+    """The streamed path: typed rows folded per applicant and counted as each group completes."""
+    def grouped(rows):
+        current = None
+        for row in rows:
+            if current is None or row["applicant"] != current["uri"]:
+                if current is not None:
+                    yield current
+                current = {"uri": row["applicant"], "name": row.get("label"), "types": set(),
+                           "age": row.get("age"), "income": row.get("income"), "decision": row.get("decision")}
+            current["types"].add(row["type"])
+        if current is not None:
+            yield current
+
+    counts = Counter()
+    tally(grouped(sparql_results.iter_select(url, "SELECT", fmt=fmt)), counts)
+    return counts
+
+def run_mode(url, mode):
+    """Child process entry point: one reader, one JSON line of measurements."""
+    baseline = rss_mib()
+    started = time.perf_counter()
+    counts = aggregate_before(url) if mode == "before" else aggregate_streamed(url, mode)
+    print(json.dumps({
+        "mode": mode,
+        "applicants": counts["applicants"],
+        "approved": counts["Approved"],
+        "seconds": round(time.perf_counter() - started, 2),
+        "rss_before_mib": round(baseline, 1),
+        "peak_rss_mib": round(peak_rss_mib(), 1),
+        "peak_growth_mib": round(peak_rss_mib() - baseline, 1)
+    }))
+
+def main():
+    parser = argparse.ArgumentParser(description="Compare peak RSS of loading vs streaming SPARQL result sets.")
+    parser.add_argument("--applicants", type=int, default=200000)
+    parser.add_argument("--modes", nargs="+", choices=MODES, default=MODES)
+    parser.add_argument("--url", help=argparse.SUPPRESS)
+    parser.add_argument("--mode", choices=MODES, help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.mode:
+        run_mode(args.url, args.mode)
+        return
+
+    with tempfile.TemporaryDirectory() as directory:
+        paths = write_payloads(directory, args.applicants)
+        server = serve(paths)
+        url = f"http://127.0.0.1:{server.server_address[1]}/query"
+        print(f"{args.applicants} applicants, {args.applicants * TYPES_PER_APPLICANT} rows; payload MiB: "
+              + ", ".join(f"{fmt} {os.path.getsize(p) / 2**20:.1f}" for fmt, p in paths.items()))
+        print(f"{'mode':<8}{'seconds':>9}{'rss before':>12}{'peak rss':>10}{'growth':>9}  applicants")
+        for mode in args.modes:
+            out = subprocess.run([sys.executable, __file__, "--url", url, "--mode", mode],
+                                 capture_output=True, text=True, check=True).stdout
+            r = json.loads(out)
+            print(f"{r['mode']:<8}{r['seconds']:>9}{r['rss_before_mib']:>12}{r['peak_rss_mib']:>10}"
+                  f"{r['peak_growth_mib']:>9}  {r['applicants']}")
+        server.shutdown()
+
+if __name__ == "__main__":
+    main()
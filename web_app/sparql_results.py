@@ -0,0 +1,158 @@
+import io
+import re
+import csv
+import json
+import requests
+from functools import lru_cache
+
+# Incremental SPARQL SELECT Reader
+# Decodes result sets row by row straight off the HTTP stream, so callers can aggregate
+# while bytes are still arriving and memory stays proportional to one row.
+# Rows are flat dicts {variable: value}; unbound variables are left out, like JSON bindings.
+FORMATS = {
+    "tsv": "text/tab-separated-values",  # compact and keeps datatypes
+    "csv": "text/csv",                   # most compact, but every value comes back as a string
+    "json": "application/sparql-results+json"
+}
+READ_CHUNK = 1 << 16
+
+XSD = "http://www.w3.org/2001/XMLSchema#"
+INTEGER_TYPES = {f"{XSD}{t}" for t in (
+    "integer", "int", "long", "short", "byte", "nonNegativeInteger", "positiveInteger",
+    "nonPositiveInteger", "negativeInteger", "unsignedLong", "unsignedInt", "unsignedShort", "unsignedByte"
+)}
+FLOAT_TYPES = {f"{XSD}decimal", f"{XSD}double", f"{XSD}float"}
+BOOLEAN_TYPE = f"{XSD}boolean"
+
+# Turtle abbreviations a TSV writer may use for numbers and booleans
+BARE_INTEGER = re.compile(r"[+-]?\d+$")
+BARE_NUMBER = re.compile(r"[+-]?(\d+\.\d*|\.\d+|\d+)([eE][+-]?\d+)?$")
+STRING_ESCAPES = re.compile(r'\\(u[0-9A-Fa-f]{4}|U[0-9A-Fa-f]{8}|.)', re.S)
+ESCAPE_CHARS = {'t': '\t', 'n': '\n', 'r': '\r', 'b': '\b', 'f': '\f', '"': '"', "'": "'", '\\': '\\'}
+
+def typed_value(lexical, datatype=None):
+    """Converts a literal to int, float or bool by datatype; anything else stays a string."""
+    try:
+        if datatype in INTEGER_TYPES: return int(lexical)
+        if datatype in FLOAT_TYPES: return float(lexical)
+    except ValueError:
+        return lexical  # ill-typed literal: keep what the store holds
+    if datatype == BOOLEAN_TYPE: return lexical in ("true", "1")
+    return lexical
+
+def unescape(text):
+    def replace(m):
+        code = m.group(1)
+        if code[0] in "uU" and len(code) > 1: return chr(int(code[1:], 16))
+        return ESCAPE_CHARS.get(code, code)
+    return STRING_ESCAPES.sub(replace, text) if "\\" in text else text
+
+@lru_cache(maxsize=4096)  # classes, flags and decisions repeat on almost every row
+def decode_tsv_term(term):
+    """Decodes one RDF term as written in SPARQL TSV results."""
+    if term.startswith("<") and term.endswith(">"):
+        return term[1:-1]
+    if term.startswith('"'):
+        # Language tags and datatype IRIs never contain a quote, so the last one closes the string
+        close = term.rfind('"')
+        if close == 0: return term
+        suffix = term[close + 1:]
+        datatype = suffix[3:-1] if suffix.startswith("^^<") else None
+        return typed_value(unescape(term[1:close]), datatype)
+    if term in ("true", "false"):
+        return term == "true"
+    if BARE_INTEGER.match(term):
+        return int(term)
+    if BARE_NUMBER.match(term):
+        return float(term)
+    return term  # blank node labels and anything unrecognised
+
+def decode_json_term(term):
+    """Decodes one {type, value, datatype} binding from SPARQL JSON results."""
+    if term.get('type') in ('literal', 'typed-literal'):
+        return typed_value(term['value'], term.get('datatype'))
+    return term['value']
+
+def iter_tsv_rows(text):
+    header = None
+    for line in text:
+        line = line.rstrip("\r\n")
+        if header is None:
+            header = [v.lstrip("?$") for v in line.split("\t")]
+            continue
+        if not line: continue
+        yield {var: decode_tsv_term(term) for var, term in zip(header, line.split("\t")) if term}
+
+def iter_csv_rows(text):
+    reader = csv.reader(text)
+    header = next(reader, None)
+    if header is None: return
+    for cells in reader:
+        if not cells: continue
+        yield {var: cell for var, cell in zip(header, cells) if cell}
+
+def iter_json_rows(text, chunk_size=READ_CHUNK):
+    """
+    Walks the results.bindings array one object at a time. Each binding is decoded with
+    raw_decode as soon as it is complete in the buffer; consumed text is dropped.
+    """
+    decoder = json.JSONDecoder()
+    bindings_start = re.compile(r'"bindings"\s*:\s*\[')
+    buf = ""
+    pos = 0
+    eof = False
+
+    def fill():
+        nonlocal buf, pos, eof
+        chunk = text.read(chunk_size)
+        if not chunk:
+            eof = True
+        buf = buf[pos:] + chunk
+        pos = 0
+
+    # 1. Skip the head up to the opening bracket of the bindings array
+    while True:
+        m = bindings_start.search(buf, pos)
+        if m:
+            pos = m.end()
+            break
+        if eof:
+            raise ValueError("SPARQL JSON result has no results.bindings array.")
+        pos = max(pos, len(buf) - 64)  # keep a tail in case the key straddles two chunks
+        fill()
+
+    # 2. One binding object per iteration
+    while True:
+        while pos < len(buf) and buf[pos] in " \t\r\n,":
+            pos += 1
+        if pos == len(buf):
+            if eof:
+                raise ValueError("SPARQL JSON result ended inside results.bindings.")
+            fill()
+            continue
+        if buf[pos] == "]":
+            return
+        try:
+            binding, end = decoder.raw_decode(buf, pos)
+        except json.JSONDecodeError:
+            if eof: raise
+            fill()  # object not complete yet
+            continue
+        pos = end
+        yield {var: decode_json_term(term) for var, term in binding.items()}
+
+READERS = {"tsv": iter_tsv_rows, "csv": iter_csv_rows, "json": iter_json_rows}
+
+def iter_select(query_url, sparql_query, fmt="tsv"):
+    """Runs a SELECT and yields typed rows while the response is still downloading."""
+    with requests.post(
+        query_url,
+        data={'query': sparql_query},
+        headers={'Accept': FORMATS[fmt]},
+        stream=True
+    ) as response:
+        response.raise_for_status()
+        response.raw.decode_content = True
+        response.raw.auto_close = False  # let the text wrapper see EOF instead of a closed file
+        text = io.TextIOWrapper(response.raw, encoding="utf-8", newline="")
+        yield from READERS[fmt](text)
@@ -0,0 +1,83 @@
+from collections import Counter
+
+import pytest
+
+import simulator
+
+LOAN = "http://www.semanticweb.org/ontology/loan_approval#"
+RULES = {"LowCRIBScoreApplicant": [{"prop": "hasCRIBScore", "type": "maxExclusive", "val": 450}]}
+
+def write_snapshot(path, n):
+    """Snapshot in the shape of Fuseki's CSV export: CRLF line ends, one applicant per row."""
+    with open(path, "w", newline="") as f:
+        f.write("applicant,loanType,hasCRIBScore\r\n")
+        for i in range(n):
+            f.write(f"{LOAN}App_{i},{LOAN}HousingLoan,{300 + (i * 37) % 500}\r\n")
+
+def expected_counts(n):
+    counts = Counter()
+    for i in range(n):
+        outcome = "Rejected" if 300 + (i * 37) % 500 < 450 else "Pending"
+        counts[("HousingLoan", outcome, outcome)] += 1
+    return counts
+
+def run_chunks(path, n_chunks):
+    totals = Counter()
+    for start, end in simulator.chunk_ranges(path, n_chunks):
+        totals.update(simulator.simulate_chunk((path, start, end, RULES, RULES)))
+    return totals
+
+@pytest.mark.parametrize("n_chunks", range(1, 33))
+def test_every_row_is_counted_once(tmp_path, n_chunks):
+    for n in range(60):
+        path = str(tmp_path / f"portfolio_{n}.csv")
+        write_snapshot(path, n)
+        assert run_chunks(path, n_chunks) == expected_counts(n), (n, n_chunks)
+
+def test_range_ending_right_after_a_newline(tmp_path):
+    path = str(tmp_path / "portfolio.csv")
+    write_snapshot(path, 3)
+    with open(path, "rb") as f:
+        f.readline()
+        first = f.tell()
+        second = first + len(f.readline())
+
+    head = simulator.simulate_chunk((path, first, second, RULES, RULES))
+    tail = simulator.simulate_chunk((path, second, second + 1, RULES, RULES))
+    assert sum(head.values()) == 1
+    assert sum(tail.values()) == 1
+
+def test_simulate_snapshot_across_processes(tmp_path):
+    path = str(tmp_path / "portfolio.csv")
+    write_snapshot(path, 500)
+    assert simulator.simulate_snapshot(path, RULES, RULES, workers=3) == expected_counts(500)
+
+def test_reused_snapshot_missing_a_column_is_re_exported(tmp_path, monkeypatch):
+    path = str(tmp_path / "portfolio.csv")
+    write_snapshot(path, 3)  # has no hasDTI column
+    exports = []
+
+    def export(query_url, props, snapshot_path):
+        exports.append(props)
+        with open(snapshot_path, "w", newline="") as f:
+            f.write("applicant,loanType," + ",".join(props) + "\r\n")
+            f.write(f"{LOAN}App_0,{LOAN}HousingLoan,400,0.5\r\n")
+
+    monkeypatch.setattr(simulator, "export_portfolio", export)
+    candidate = dict(RULES, HighDTIApplicant=[{"prop": "hasDTI", "type": "minExclusive", "val": 0.4}])
+    report = simulator.run_simulation(candidate, candidate, None, path, reuse_snapshot=True, workers=1)
+    assert exports == [["hasCRIBScore", "hasDTI"]]
+    assert report["applicants"] == 1
+
+    simulator.run_simulation(RULES, RULES, None, path, reuse_snapshot=True, workers=1)
+    assert len(exports) == 1  # the refreshed snapshot covers it
+
+@pytest.mark.parametrize("val", ["nan", "inf", "-Infinity", float("nan"), float("inf")])
+def test_non_finite_rule_values_are_rejected(val):
+    for op in ("maxExclusive", "hasValue"):
+        rules = {"LowCRIBScoreApplicant": [{"prop": "hasCRIBScore", "type": op, "val": val}]}
+        if op == "hasValue" and isinstance(val, str):
+            simulator.validate_constraints(rules)  # compared as a literal, never compiled as a number
+            continue
+        with pytest.raises(ValueError):
+            simulator.validate_constraints(rules)